@@ -0,0 +1,116 @@
+import asyncio
+import datetime
+import timeit
+
+from aiogram import types
+
+from utils.translation.localization import get_localized_message
+from utils.ui import get_ui
+
+
+MEAL = {"food_name": "plov", "grams": 250, "calories": 480, "protein": 14, "fat": 21, "carbs": 58}
+DIARY = {"total_calories": 1850, "total_protein": 92, "total_fat": 61, "total_carbs": 210}
+DATE = datetime.date(2025, 1, 1)
+
+
+async def legacy_meal_card(language, meal):
+    calorie_text = await get_localized_message(language, "calorie")
+    protein_text = await get_localized_message(language, "protein")
+    fat_text = await get_localized_message(language, "fat")
+    carbs_text = await get_localized_message(language, "carbs")
+
+    text = (
+        f"🍽️ <b>{meal['food_name'].title()}: {meal['grams']} g</b>\n"
+        f"🔥 {calorie_text}: {meal['calories']} kkal\n"
+        f"🍗 {protein_text}: {meal['protein']} g\n"
+        f"🥑 {fat_text}: {meal['fat']} g\n"
+        f"🍞 {carbs_text}: {meal['carbs']} g\n\n"
+        f"<i>{await get_localized_message(language, 'confirm_meal_prompt')}</i>"
+    )
+
+    keyboard = types.InlineKeyboardMarkup(inline_keyboard=[
+        [types.InlineKeyboardButton(text=await get_localized_message(language, "save_button"), callback_data="save_meal")],
+        [types.InlineKeyboardButton(text=await get_localized_message(language, "edit_grams_button"), callback_data="edit_grams")],
+        [types.InlineKeyboardButton(text=await get_localized_message(language, "cancel_button"), callback_data="cancel_meal")]
+    ])
+    return text, keyboard
+
+
+async def legacy_diary_card(language, date, diary):
+    calorie_text = await get_localized_message(language, "calorie")
+    protein_text = await get_localized_message(language, "protein")
+    fat_text = await get_localized_message(language, "fat")
+    carbs_text = await get_localized_message(language, "carbs")
+
+    text = (
+        f"<b>📔 {date.strftime('%d.%m.%Y')}</b>\n\n"
+        f"🔥 {calorie_text}: <b>{diary['total_calories']} kkal</b>\n"
+        f"🍗 {protein_text}: <b>{diary['total_protein']} g</b>\n"
+        f"🥑 {fat_text}: <b>{diary['total_fat']} g</b>\n"
+        f"🍞 {carbs_text}: <b>{diary['total_carbs']} g</b>"
+    )
+
+    keyboard = types.ReplyKeyboardMarkup(keyboard=[
+        [
+            types.KeyboardButton(text=await get_localized_message(language, "add_meal_btn")),
+            types.KeyboardButton(text=await get_localized_message(language, "my_diary_btn"))
+        ],
+        [
+            types.KeyboardButton(text=await get_localized_message(language, "settings_btn")),
+            types.KeyboardButton(text=await get_localized_message(language, "help_btn"))
+        ]
+    ], resize_keyboard=True, input_field_placeholder="Choose")
+    return text, keyboard
+
+
+def bundle_meal_card(language, meal):
+    ui = get_ui(language)
+    return ui.render_meal_card(meal), ui.meal_actions
+
+
+def bundle_diary_card(language, date, diary):
+    ui = get_ui(language)
+    return ui.render_diary_card(date, diary), ui.main_menu
+
+
+def measure(label, func, number):
+    seconds = min(timeit.repeat(func, number=1, repeat=5))
+    print(f"{label:<20} {seconds / number * 1e6:8.2f} us/call")
+    return seconds
+
+
+def batch(loop, render, number):
+    async def run():
+        for _ in range(number):
+            await render()
+
+    return lambda: loop.run_until_complete(run())
+
+
+def repeat(render, number):
+    def run():
+        for _ in range(number):
+            render()
+
+    return run
+
+
+def main(number=20000):
+    loop = asyncio.new_event_loop()
+
+    try:
+        legacy_meal = measure("legacy meal card", batch(loop, lambda: legacy_meal_card("ru", MEAL), number), number)
+        bundle_meal = measure("bundle meal card", repeat(lambda: bundle_meal_card("ru", MEAL), number), number)
+        legacy_diary = measure(
+            "legacy diary card", batch(loop, lambda: legacy_diary_card("ru", DATE, DIARY), number), number
+        )
+        bundle_diary = measure("bundle diary card", repeat(lambda: bundle_diary_card("ru", DATE, DIARY), number), number)
+    finally:
+        loop.close()
+
+    print(f"meal card speedup:  x{legacy_meal / bundle_meal:.1f}")
+    print(f"diary card speedup: x{legacy_diary / bundle_diary:.1f}")
+
+
+if __name__ == "__main__":
+    main()
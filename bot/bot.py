@@ -1,21 +1,22 @@
 import asyncio
 import logging
-import requests
+import uuid
 
 from aiogram import types, F
 from aiogram.methods import DeleteWebhook
 from aiogram.filters import CommandStart, Command
 from aiogram.fsm.context import FSMContext
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from data import config
-from loader import bot, dp
+from loader import bot, dp, pending_meals
+from webhook import run_webhook
+from workers import run_supervisor
 
 from utils.fetch import (
-    create_meal_data,
     create_user_data,
-    get_diary_data_by_date,
-    get_or_create_diary,
+    get_context,
+    get_diary_range,
     get_settings,
     get_user_data,
     get_language,
@@ -23,7 +24,11 @@ from utils.fetch import (
     update_user_language,
     update_user_reminder,
     update_user_weight,
-    get_user_stats
+    get_user_stats,
+    log_meal,
+    conditional_stats,
+    diary_prefetcher,
+    user_cache
 )
 
 from utils.keyboards import (
@@ -40,7 +45,12 @@ from utils.states import (
     UserSettingsStates,
 )
 
+from utils.images import prepare_image, select_photo_size
+from utils.photo_storage import photo_uploader
+from utils.recognition_cache import recognition_cache
+from utils.router import resolve_argument, resolve_button
 from utils.translation.localization import get_localized_message
+from utils.ui import get_ui
 from utils.utils import analyze_image_with_gpt
 
 
@@ -48,8 +58,6 @@ logging.basicConfig(level=logging.INFO)
 
 TOKEN = config.TOKEN
 
-TEMP_RECOGNIZED_MEALS = {}
-
 
 @dp.message(Command("stat"))
 async def admin_stat(message: types.Message):
@@ -62,16 +70,73 @@ async def admin_stat(message: types.Message):
         await message.answer("⚠️ Не удалось получить статистику.")
         return
 
+    language_lines = "\n".join(
+        f"🌐 {language.upper()}: {row['total']} / 7д: {row['active_7_days']} / 24ч: {row['active_1_days']}"
+        for language, row in stats.get("by_language", {}).items()
+    )
+    daily_lines = "\n".join(
+        f"📅 {row['date']}: {row['active_users']} польз., {row['meals_logged']} блюд"
+        for row in stats.get("daily", [])
+    )
+
+    cache_stats = user_cache.stats()
+    recognition_stats = recognition_cache.stats()
+    prefetch_stats = diary_prefetcher.stats()
+
     text = (
         "📊 <b>Статистика бота</b>\n\n"
         f"👥 Всего пользователей: <b>{stats['total_users']}</b>\n"
         f"🟢 Активны за 7 дней: <b>{stats['active_7_days']}</b>\n"
-        f"🕒 Активны за 24 часа: <b>{stats['active_1_days']}</b>"
+        f"🕒 Активны за 24 часа: <b>{stats['active_1_days']}</b>\n\n"
+        f"{language_lines}\n\n"
+        f"{daily_lines}\n\n"
+        f"🗂 Кэш профилей: <b>{cache_stats['hits']}</b> попаданий / "
+        f"<b>{cache_stats['misses']}</b> промахов ({cache_stats['size']} записей)\n"
+        f"🔁 Условные запросы: <b>{conditional_stats['not_modified']}</b> без изменений / "
+        f"<b>{conditional_stats['modified']}</b> обновлено\n"
+        f"🍽 Кэш распознаваний: <b>{recognition_stats['exact_hits']}</b> точных / "
+        f"<b>{recognition_stats['similar_hits']}</b> похожих / "
+        f"<b>{recognition_stats['misses']}</b> промахов ({recognition_stats['hit_rate']:.0%})\n"
+        f"⏩ Предзагрузка дневника: <b>{prefetch_stats['hits']}</b> попаданий / "
+        f"<b>{prefetch_stats['misses']}</b> промахов, впустую <b>{prefetch_stats['wasted']}</b>, "
+        f"отменено <b>{prefetch_stats['cancelled']}</b>"
     )
 
     await message.answer(text, parse_mode="html")
 
 
+async def send_range_report(message: types.Message, days):
+    user_id = message.from_user.id
+    language = await get_language(user_id)
+    main_menu_k = await main_menu_keyboard(language)
+
+    end = datetime.now().date()
+    report = await get_diary_range(user_id, end - timedelta(days=days - 1), end)
+
+    if report is None:
+        error_message = await get_localized_message("none", "error")
+        await message.answer(error_message, reply_markup=main_menu_k)
+        return
+
+    if not report["logged_days"]:
+        no_data_text = await get_localized_message(language, "no_diary_data")
+        await message.answer(no_data_text, reply_markup=main_menu_k)
+        return
+
+    text = get_ui(language).render_range_card(report, days)
+    await message.answer(text, reply_markup=main_menu_k, parse_mode="html")
+
+
+@dp.message(Command("week"))
+async def week_report(message: types.Message):
+    await send_range_report(message, 7)
+
+
+@dp.message(Command("month"))
+async def month_report(message: types.Message):
+    await send_range_report(message, 30)
+
+
 @dp.message(CommandStart())
 async def start_command(message: types.Message):
     user_id = message.from_user.id
@@ -109,8 +174,7 @@ async def process_language(callback: types.CallbackQuery):
         await callback.message.answer(message_answer)
 
 
-@dp.message(F.photo)
-async def get_meal_photo(message: types.Message, state: FSMContext):
+async def process_meal_photo(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
     language = (await get_settings(user_id)).get("language", "ru")
 
@@ -119,25 +183,40 @@ async def get_meal_photo(message: types.Message, state: FSMContext):
     msg = await message.answer(processing_photo_message)
     message_id = msg.message_id
 
-    photo = message.photo[-1]
-    file_info = await bot.get_file(photo.file_id)
-    file_path = file_info.file_path
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    local_path = f"image/{user_id}-{timestamp}.jpg"
+    photo = select_photo_size(message.photo)
+    local_path = None
+
+    gpt_data = None
+    cached = await recognition_cache.get(photo.file_unique_id, language)
+    if cached is not None:
+        gpt_data, local_path = cached
+
+    if gpt_data is None:
+        try:
+            buffer = await bot.download(photo)
+            image_bytes = buffer.getvalue()
+        except Exception as e:
+            logging.warning(f"Photo download failed for {user_id}: {e}")
+            await bot.delete_message(chat_id=message.chat.id, message_id=message_id)
+            await message.answer(await get_localized_message(language, "error"))
+            await state.clear()
+            return
 
-    file_url = f"https://api.telegram.org/file/bot{TOKEN}/{file_path}"
-    response = requests.get(file_url)
+        image = await prepare_image(image_bytes)
 
-    if response.status_code != 200:
-        await bot.delete_message(chat_id=message.chat.id, message_id=message_id)
-        await message.answer(await get_localized_message(language, "error"))
-        await state.clear()
-        return
+        cached = await recognition_cache.get_similar(image.phash, language, photo.file_unique_id)
+        if cached is not None:
+            gpt_data, local_path = cached
+
+        # A near-duplicate reuses the photo already stored for it.
+        if config.SAVE_PHOTOS and local_path is None:
+            local_path = photo_uploader.ingest(image)
 
-    with open(local_path, "wb") as f:
-        f.write(response.content)
+        if gpt_data is None:
+            gpt_data = await analyze_image_with_gpt(language, image.base64)
 
-    gpt_data = await analyze_image_with_gpt(language, local_path)
+            if "error" not in gpt_data:
+                await recognition_cache.set(photo.file_unique_id, image.phash, language, gpt_data, local_path)
 
     if "error" in gpt_data:
         await bot.delete_message(chat_id=message.chat.id, message_id=message_id)
@@ -147,124 +226,28 @@ async def get_meal_photo(message: types.Message, state: FSMContext):
     
     await state.update_data(meal_data=gpt_data)
 
-    TEMP_RECOGNIZED_MEALS[user_id] = {
+    await pending_meals.set(user_id, {
         "data": gpt_data,
-        "photo": local_path
-    }
+        "photo": local_path,
+        "idempotency_key": uuid.uuid4().hex
+    })
 
-    food_name = gpt_data["food_name"]
-    calories = gpt_data["calories"]
-    protein = gpt_data["protein"]
-    fat = gpt_data["fat"]
-    carbs = gpt_data["carbs"]
-    grams = gpt_data["grams"]
-
-    calorie_text = await get_localized_message(language, "calorie")
-    protein_text = await get_localized_message(language, "protein")
-    fat_text = await get_localized_message(language, "fat")
-    carbs_text = await get_localized_message(language, "carbs")
-
-    text = (
-        f"🍽️ <b>{food_name.title()}: {grams} g</b>\n"
-        f"🔥 {calorie_text}: {calories} kkal\n"
-        f"🍗 {protein_text}: {protein} g\n"
-        f"🥑 {fat_text}: {fat} g\n"
-        f"🍞 {carbs_text}: {carbs} g\n\n"
-        f"<i>{await get_localized_message(language, 'confirm_meal_prompt')}</i>"
-    )
-
-    text_button_1 = await get_localized_message(language, "save_button")
-    text_button_2 = await get_localized_message(language, "edit_grams_button")
-    text_button_3 = await get_localized_message(language, "cancel_button")
-
-    keyboard = types.InlineKeyboardMarkup(inline_keyboard=[
-        [types.InlineKeyboardButton(text=text_button_1, callback_data="save_meal")],
-        [types.InlineKeyboardButton(text=text_button_2, callback_data="edit_grams")],
-        [types.InlineKeyboardButton(text=text_button_3, callback_data="cancel_meal")]
-    ])
+    ui = get_ui(language)
+    text = ui.render_meal_card(gpt_data)
 
     await bot.delete_message(chat_id=message.chat.id, message_id=message_id)
 
-    await message.answer(text, parse_mode="HTML", reply_markup=keyboard)
+    await message.answer(text, parse_mode="HTML", reply_markup=ui.meal_actions)
 
 
-@dp.message(F.photo, MealStates.waiting_for_photo)
+@dp.message(F.photo)
 async def get_meal_photo(message: types.Message, state: FSMContext):
-    user_id = message.from_user.id
-    language = (await get_settings(user_id)).get("language", "ru")
-
-    processing_photo_message = await get_localized_message(language, "processing_photo")
-
-    msg = await message.answer(processing_photo_message)
-    message_id = msg.message_id
-
-    photo = message.photo[-1]
-    file_info = await bot.get_file(photo.file_id)
-    file_path = file_info.file_path
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    local_path = f"image/{user_id}-{timestamp}.jpg"
-
-    file_url = f"https://api.telegram.org/file/bot{TOKEN}/{file_path}"
-    response = requests.get(file_url)
+    await process_meal_photo(message, state)
 
-    if response.status_code != 200:
-        await bot.delete_message(chat_id=message.chat.id, message_id=message_id)
-        await message.answer(await get_localized_message(language, "error"))
-        await state.clear()
-        return
-
-    with open(local_path, "wb") as f:
-        f.write(response.content)
-
-    gpt_data = await analyze_image_with_gpt(language, local_path)
-
-    if "error" in gpt_data:
-        await bot.delete_message(chat_id=message.chat.id, message_id=message_id)
-        await message.answer(await get_localized_message(language, "food_not_recognized"))
-        await state.clear()
-        return
 
-    await state.update_data(meal_data=gpt_data)
-
-    TEMP_RECOGNIZED_MEALS[user_id] = {
-        "data": gpt_data,
-        "photo": local_path
-    }
-
-    food_name = gpt_data["food_name"]
-    calories = gpt_data["calories"]
-    protein = gpt_data["protein"]
-    fat = gpt_data["fat"]
-    carbs = gpt_data["carbs"]
-    grams = gpt_data["grams"]
-
-    calorie_text = await get_localized_message(language, "calorie")
-    protein_text = await get_localized_message(language, "protein")
-    fat_text = await get_localized_message(language, "fat")
-    carbs_text = await get_localized_message(language, "carbs")
-
-    text = (
-        f"🍽️ <b>{food_name.title()}: {grams} g</b>\n"
-        f"🔥 {calorie_text}: {calories} kkal\n"
-        f"🍗 {protein_text}: {protein} g\n"
-        f"🥑 {fat_text}: {fat} g\n"
-        f"🍞 {carbs_text}: {carbs} g\n\n"
-        f"<i>{await get_localized_message(language, 'confirm_meal_prompt')}</i>"
-    )
-
-    text_button_1 = await get_localized_message(language, "save_button")
-    text_button_2 = await get_localized_message(language, "edit_grams_button")
-    text_button_3 = await get_localized_message(language, "cancel_button")
-
-    keyboard = types.InlineKeyboardMarkup(inline_keyboard=[
-        [types.InlineKeyboardButton(text=text_button_1, callback_data="save_meal")],
-        [types.InlineKeyboardButton(text=text_button_2, callback_data="edit_grams")],
-        [types.InlineKeyboardButton(text=text_button_3, callback_data="cancel_meal")]
-    ])
-
-    await bot.delete_message(chat_id=message.chat.id, message_id=message_id)
-
-    await message.answer(text, parse_mode="HTML", reply_markup=keyboard)
+@dp.message(F.photo, MealStates.waiting_for_photo)
+async def get_meal_photo_in_state(message: types.Message, state: FSMContext):
+    await process_meal_photo(message, state)
 
 
 @dp.callback_query(F.data == "save_meal")
@@ -275,42 +258,30 @@ async def process_save_meal(callback: types.CallbackQuery, state: FSMContext):
 
     user_id = callback.from_user.id
     language = await get_language(user_id)
-    user_id_from_api = await get_settings(user_id)
-    user_id_from_api = user_id_from_api.get("id")
 
     main_menu_k = await main_menu_keyboard(language)
     error_text = await get_localized_message("none", "error")
 
-    meal_data = TEMP_RECOGNIZED_MEALS.get(user_id)
+    meal_data = await pending_meals.get(user_id)
     if not meal_data:
         await callback.message.answer(error_text, reply_markup=main_menu_k)
         return
 
-    data = meal_data.get("data")
-    photo_path = meal_data.get("photo")
-
-    diary_id = await get_or_create_diary(user_id_from_api)
-    if not diary_id:
-        await callback.message.answer(error_text, reply_markup=main_menu_k)
-        return
-
-
-    result = await create_meal_data(
-        diary_id=diary_id,
-        food_name=data["food_name"],
-        grams=data.get("grams", 100),
-        calories=data["calories"],
-        protein=data["protein"],
-        fat=data["fat"],
-        carbs=data["carbs"],
-        ai_raw_json=data,
-        photo_path=photo_path
+    result = await log_meal(
+        user_id,
+        meal_data.get("data"),
+        photo_path=meal_data.get("photo"),
+        idempotency_key=meal_data.get("idempotency_key")
     )
 
     if result:
         success_text = await get_localized_message(language, "meal_saved")
-        await callback.message.answer(success_text, reply_markup=main_menu_k)
-        TEMP_RECOGNIZED_MEALS.pop(user_id, None)
+        diary_date = datetime.strptime(result["diary"]["date"], "%Y-%m-%d").date()
+        diary_text = get_ui(language).render_diary_card(diary_date, result["diary"])
+
+        await callback.message.answer(f"{success_text}\n\n{diary_text}", reply_markup=main_menu_k, parse_mode="html")
+        await pending_meals.delete(user_id)
+        diary_prefetcher.invalidate(user_id)
     else:
         await callback.message.answer(error_text)
 
@@ -326,7 +297,7 @@ async def process_cancel_meal(callback: types.CallbackQuery, state: FSMContext):
 
     main_menu_k = await main_menu_keyboard(language)
 
-    TEMP_RECOGNIZED_MEALS.pop(user_id, None)
+    await pending_meals.delete(user_id)
 
     cancel_text = await get_localized_message(language, "meal_canceled")
     await callback.message.answer(cancel_text, reply_markup=main_menu_k)
@@ -342,31 +313,10 @@ async def back_button_process(callback: types.CallbackQuery, state: FSMContext):
     data = await state.get_data()
     meal_data = data.get("meal_data", {})
 
-    calorie_text = await get_localized_message(language, "calorie")
-    protein_text = await get_localized_message(language, "protein")
-    fat_text = await get_localized_message(language, "fat")
-    carbs_text = await get_localized_message(language, "carbs")
-
-    text = (
-        f"{meal_data['food_name']}\n"
-        f"🔥 {calorie_text}: {meal_data['calories']} kkal\n"
-        f"🍗 {protein_text}: {meal_data['protein']} g\n"
-        f"🥑 {fat_text}: {meal_data['fat']} g\n"
-        f"🍞 {carbs_text}: {meal_data['carbs']} g\n\n"
-        f"<i>{await get_localized_message(language, 'confirm_meal_prompt')}</i>"
-    )
-
-    text_button_1 = await get_localized_message(language, "save_button")
-    text_button_2 = await get_localized_message(language, "edit_grams_button")
-    text_button_3 = await get_localized_message(language, "cancel_button")
-
-    keyboard = types.InlineKeyboardMarkup(inline_keyboard=[
-        [types.InlineKeyboardButton(text=text_button_1, callback_data="save_meal")],
-        [types.InlineKeyboardButton(text=text_button_2, callback_data="edit_grams")],
-        [types.InlineKeyboardButton(text=text_button_3, callback_data="cancel_meal")]
-    ])
+    ui = get_ui(language)
+    text = ui.render_meal_card(meal_data)
 
-    await callback.message.answer(text, reply_markup=keyboard, parse_mode="html")
+    await callback.message.answer(text, reply_markup=ui.meal_actions, parse_mode="html")
 
 
 @dp.callback_query(F.data == "edit_grams")
@@ -424,33 +374,16 @@ async def handle_new_value(message: types.Message, state: FSMContext):
 
     await state.update_data(meal_data=meal_data)
 
-    calorie_text = await get_localized_message(language, "calorie")
-    protein_text = await get_localized_message(language, "protein")
-    fat_text = await get_localized_message(language, "fat")
-    carbs_text = await get_localized_message(language, "carbs")
-
-    text = (
-        f"{meal_data['food_name']}, {meal_data['grams']} g\n"
-        f"🔥 {calorie_text}: {meal_data['calories']} kkal\n"
-        f"🍗 {protein_text}: {meal_data['protein']} g\n"
-        f"🥑 {fat_text}: {meal_data['fat']} g\n"
-        f"🍞 {carbs_text}: {meal_data['carbs']} g\n\n"
-        f"<i>{await get_localized_message(language, 'confirm_meal_prompt')}</i>"
-    )
+    pending = await pending_meals.get(user_id)
+    if pending:
+        await pending_meals.set(user_id, {**pending, "data": meal_data})
 
-    text_button_1 = await get_localized_message(language, "save_button")
-    text_button_2 = await get_localized_message(language, "edit_grams_button")
-    text_button_3 = await get_localized_message(language, "cancel_button")
-
-    keyboard = types.InlineKeyboardMarkup(inline_keyboard=[
-        [types.InlineKeyboardButton(text=text_button_1, callback_data="save_meal")],
-        [types.InlineKeyboardButton(text=text_button_2, callback_data="edit_grams")],
-        [types.InlineKeyboardButton(text=text_button_3, callback_data="cancel_meal")]
-    ])
+    ui = get_ui(language)
+    text = ui.render_meal_card(meal_data)
 
     param_updated_message = await get_localized_message(language, "param_updated")
     await message.answer(param_updated_message)
-    await message.answer(text, reply_markup=keyboard, parse_mode="html")
+    await message.answer(text, reply_markup=ui.meal_actions, parse_mode="html")
 
 
 
@@ -459,28 +392,7 @@ async def process_goal_choose(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
     language = await get_language(user_id)
 
-    user_message = message.text.strip().lower()
-
-    goals_map = {
-        "ru": {
-            "похудение": "lose",
-            "поддержание веса": "maintain",
-            "набор массы": "gain"
-        },
-        "en": {
-            "lose weight": "lose",
-            "maintain weight": "maintain",
-            "gain weight": "gain"
-        },
-        "uz": {
-            "ozish": "lose",
-            "vaznni saqlash": "maintain",
-            "vazn yig'ish": "gain"
-        }
-    }
-
-    lang_goals = goals_map.get(language, {})
-    goal_code = lang_goals.get(user_message.lower())
+    goal_code = resolve_argument(message.text, "goal")
 
     if goal_code:
         result = await update_user_goal(user_id, goal_code)
@@ -535,14 +447,7 @@ async def process_weight_input(message: types.Message, state: FSMContext):
 @dp.message(UserSettingsStates.change_language)
 async def change_language_process(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    user_message = message.text
-
-    lang_map = {
-        "uz🇺🇿": "uz",
-        "ru🇷🇺": "ru",
-        "eng🇺🇸": "en"
-    }
-    selected = lang_map.get(user_message)
+    selected = resolve_argument(message.text, "language")
 
     if not selected:
         current_lang = await get_language(user_id)
@@ -569,43 +474,32 @@ async def handle_diary_navigation(callback: types.CallbackQuery):
     await callback.answer()
 
     user_id = callback.from_user.id
-    language = await get_language(user_id)
-    user_id_from_api = await get_settings(user_id)
-    user_id_from_api = user_id_from_api.get("id")
-
     error_message = await get_localized_message("none", "error")
-    main_menu_k = await main_menu_keyboard(language)
 
     date_str = callback.data.split("_")[-1]
     try:
         date = datetime.strptime(date_str, "%Y-%m-%d").date()
     except ValueError:
+        language = await get_language(user_id)
+        main_menu_k = await main_menu_keyboard(language)
         await callback.message.answer(error_message, reply_markup=main_menu_k)
         return
 
-    diary_data = await get_diary_data_by_date(user_id_from_api, date.year, date.month, date.day)
+    context = await diary_prefetcher.get(user_id, date)
+    if not context:
+        await callback.message.answer(error_message)
+        return
+
+    language = context["user"]["language"]
+    main_menu_k = await main_menu_keyboard(language)
+
+    diary_data = context["diary"]
     if not diary_data:
         no_data_text = await get_localized_message(language, "no_diary_data")
         await callback.message.answer(no_data_text, reply_markup=main_menu_k)
         return
 
-    total_kcal = diary_data.get("total_calories", 0)
-    total_protein = diary_data.get("total_protein", 0)
-    total_fat = diary_data.get("total_fat", 0)
-    total_carbs = diary_data.get("total_carbs", 0)
-
-    calorie_text = await get_localized_message(language, "calorie")
-    protein_text = await get_localized_message(language, "protein")
-    fat_text = await get_localized_message(language, "fat")
-    carbs_text = await get_localized_message(language, "carbs")
-
-    diary_text = (
-        f"<b>📔 {date.strftime('%d.%m.%Y')}</b>\n\n"
-        f"🔥 {calorie_text}: <b>{total_kcal} kkal</b>\n"
-        f"🍗 {protein_text}: <b>{total_protein} g</b>\n"
-        f"🥑 {fat_text}: <b>{total_fat} g</b>\n"
-        f"🍞 {carbs_text}: <b>{total_carbs} g</b>"
-    )
+    diary_text = get_ui(language).render_diary_card(date, diary_data)
 
     diary_navigation = await diary_navigation_keyboard(date)
 
@@ -615,158 +509,142 @@ async def handle_diary_navigation(callback: types.CallbackQuery):
         parse_mode="html"
     )
 
+    if config.DIARY_PREFETCH:
+        diary_prefetcher.prefetch(user_id, date)
 
-@dp.message()
-async def process_message(message: types.Message, state: FSMContext):
-    user_message = message.text
-    user_id = message.from_user.id
 
-    language = await get_language(user_id)
+async def open_meal_photo(message: types.Message, state: FSMContext, language):
+    await state.set_state(MealStates.waiting_for_photo)
+    text = await get_localized_message(language, "send_photo_meal")
+    await message.answer(text)
+
+
+async def open_settings(message: types.Message, state: FSMContext, language):
+    settings = await get_settings(message.from_user.id)
+    if not settings:
+        error_message = await get_localized_message("none", "error")
+        await message.answer(error_message)
+
+    ui = get_ui(language)
+    await message.answer(ui.render_settings_card(settings), reply_markup=ui.settings_menu)
 
+
+async def open_goal_choice(message: types.Message, state: FSMContext, language):
+    await state.set_state(UserSettingsStates.choose_goal)
+    prompt = await get_localized_message(language, "choose_goal_prompt")
+    keyboard = await calorie_goal_keyboard(language)
+
+    await message.answer(prompt, reply_markup=keyboard)
+
+
+async def open_language_choice(message: types.Message, state: FSMContext, language):
+    await state.set_state(UserSettingsStates.change_language)
+    prompt = await get_localized_message(language, "choose_language_prompt")
+    keyboard = await change_language_keyboard(language)
+    await message.answer(prompt, reply_markup=keyboard)
+
+
+async def open_weight_input(message: types.Message, state: FSMContext, language):
+    await state.set_state(UserSettingsStates.change_weight)
+    prompt = await get_localized_message(language, "enter_weight_prompt")
+    await message.answer(prompt)
+
+
+async def toggle_reminder(message: types.Message, state: FSMContext, language):
+    user_id = message.from_user.id
     settings_keyboard = await settings_menu_keyboard(language)
+
+    settings = await get_settings(user_id)
+    reminder = False if settings.get("morning_summary_enabled") else True
+    result = await update_user_reminder(user_id, reminder)
+    if result == 200:
+        confirmation = await get_localized_message(language, "reminder_update")
+        await message.answer(confirmation, reply_markup=settings_keyboard)
+
+    else:
+        error_text = await get_localized_message("none", "error")
+        await message.answer(error_text, reply_markup=settings_keyboard)
+
+
+async def open_diary(message: types.Message, state: FSMContext, language):
+    today = datetime.now().date()
+
+    context = await get_context(message.from_user.id, today)
+    if not context:
+        error_message = await get_localized_message("none", "error")
+        await message.answer(error_message)
+        return
+
+    diary_data = context["diary"]
+    if not diary_data:
+        no_data_text = await get_localized_message(language, "no_diary_data")
+        main_menu_k = await main_menu_keyboard(language)
+        await message.answer(no_data_text, reply_markup=main_menu_k)
+        return
+
+    diary_text = get_ui(language).render_diary_card(today, diary_data)
+
+    diary_navigation = await diary_navigation_keyboard(today)
+
+    await message.answer(
+        diary_text,
+        reply_markup=diary_navigation,
+        parse_mode="html"
+    )
+
+    if config.DIARY_PREFETCH:
+        diary_prefetcher.prefetch(message.from_user.id, today)
+
+
+async def open_help(message: types.Message, state: FSMContext, language):
+    await message.answer("Help button")
+
+
+async def back_to_menu(message: types.Message, state: FSMContext, language):
+    message_answer = await get_localized_message(language, "main_menu")
     main_menu_k = await main_menu_keyboard(language)
+    await message.answer(message_answer, reply_markup=main_menu_k)
 
-    match user_message:
-        case "📸 Добавить еду" | "📸 Add meal" | "📸 Ovqat qoshish":
-            await state.set_state(MealStates.waiting_for_photo)
-            text = await get_localized_message(language, "send_photo_meal")
-            await message.answer(text)
-
-        case "⚙️ Настройки" | "⚙️ Settings" | "⚙️ Sozlamalar":
-            settings = await get_settings(user_id)
-            if not settings:
-                error_message = await get_localized_message("none", "error")
-                await message.answer(error_message)
-
-            # Локализация целей
-            goal_map = {
-                "maintain": {
-                    "ru": "Поддержание веса",
-                    "uz": "Vaznni saqlash",
-                    "en": "Maintain weight"
-                },
-                "gain": {
-                    "ru": "Набор массы",
-                    "uz": "Vazn yig'ish",
-                    "en": "Gain weight"
-                },
-                "lose": {
-                    "ru": "Похудение",
-                    "uz": "Ozish",
-                    "en": "Lose weight"
-                }
-            }
-
-            goal_key = settings.get("goal")
-            goal_localized = goal_map.get(goal_key, {}).get(language, "-")
-
-            weight = settings.get("weight_kg")
-            weight_display = f"{weight} kg" if weight else "-"
-
-            reminder_display = "✅ ON" if settings.get("morning_summary_enabled") else "❌ OFF"
-
-            choose_text = await get_localized_message(language, "choose_button")
-
-            text = (
-                f"{await get_localized_message(language, 'settings_menu')}\n\n"
-                f"{await get_localized_message(language, 'change_goal')}: {goal_localized}\n"
-                f"{await get_localized_message(language, 'change_weight')}: {weight_display}\n"
-                f"{await get_localized_message(language, 'change_language')}: {language.upper()}\n"
-                f"{await get_localized_message(language, 'toggle_reminder')}: {reminder_display}\n\n"
-                f"{choose_text}"
-            )
-
-            await message.answer(text, reply_markup=settings_keyboard)
-
-        case "🎯 Цель калорий" | "🎯 Calorie goal" | "🎯 Kaloriya maqsadi":
-            await state.set_state(UserSettingsStates.choose_goal)
-            prompt = await get_localized_message(language, "choose_goal_prompt")
-            keyboard = await calorie_goal_keyboard(language)
 
-            await message.answer(prompt, reply_markup=keyboard)
+async def unknown_message(message: types.Message, state: FSMContext, language):
+    default_message = await get_localized_message(language, "default_message")
+    main_menu_k = await main_menu_keyboard(language)
+    await message.answer(default_message, reply_markup=main_menu_k)
 
-        case "🌐 Язык" | "🌐 Language" | "🌐 Til":
-            await state.set_state(UserSettingsStates.change_language)
-            prompt = await get_localized_message(language, "choose_language_prompt")
-            keyboard = await change_language_keyboard(language)
-            await message.answer(prompt, reply_markup=keyboard)
 
-        case "⚖️ Вес" | "⚖️ Weight" | "⚖️ Vazn":
-            await state.set_state(UserSettingsStates.change_weight)
-            prompt = await get_localized_message(language, "enter_weight_prompt")
-            await message.answer(prompt)
-
-        case "🔔 Вкл/выкл утреннее напоминание" | "🔔 Toggle morning reminder" | "🔔 Ertalabgi eslatmani yoqish/o‘chirish":
-            settings = await get_settings(user_id)
-            reminder = False if settings.get("morning_summary_enabled") else True
-            result = await update_user_reminder(user_id, reminder)
-            if result == 200:
-                confirmation = await get_localized_message(language, "reminder_update")
-                await message.answer(confirmation, reply_markup=settings_keyboard)
-            
-            else:
-                error_text = await get_localized_message("none", "error")
-                await message.answer(error_text, reply_markup=settings_keyboard)
-
-        case "📔 Мой дневник" | "📔 My diary" | "📔 Meni kundaligim":
-            user_id_from_api = await get_settings(user_id)
-            user_id_from_api = user_id_from_api.get("id")
-
-            today = datetime.now().date()
-            year, month, day = today.year, today.month, today.day
-
-            diary_data = await get_diary_data_by_date(user_id_from_api, year, month, day)
-
-            if not diary_data:
-                no_data_text = await get_localized_message(language, "no_diary_data")
-                await message.answer(no_data_text, reply_markup=main_menu_k)
-                return
-
-            date_str = today.strftime("%d.%m.%Y")
-            total_kcal = diary_data.get("total_calories", 0)
-            total_protein = diary_data.get("total_protein", 0)
-            total_fat = diary_data.get("total_fat", 0)
-            total_carbs = diary_data.get("total_carbs", 0)
-
-            calorie_text = await get_localized_message(language, "calorie")
-            protein_text = await get_localized_message(language, "protein")
-            fat_text = await get_localized_message(language, "fat")
-            carbs_text = await get_localized_message(language, "carbs")
-
-            diary_text = (
-                f"<b>📔 {date_str}</b>\n\n"
-                f"🔥 {calorie_text}: <b>{total_kcal} kkal</b>\n"
-                f"🍗 {protein_text}: <b>{total_protein} g</b>\n"
-                f"🥑 {fat_text}: <b>{total_fat} g</b>\n"
-                f"🍞 {carbs_text}: <b>{total_carbs} g</b>"
-            )
-
-            diary_navigation = await diary_navigation_keyboard(today)
-
-            await message.answer(
-                diary_text,
-                reply_markup=diary_navigation,
-                parse_mode="html"
-            )
-
-        case "❓ Помощь" | "❓ Help" | "❓ Yordam":
-            await message.answer("Help button")
-
-        case "⬅️ Назад" | "⬅️ Back" | "⬅️ Ortga":
-            message_answer = await get_localized_message(language, "main_menu")
-            await message.answer(message_answer, reply_markup=main_menu_k)
-
-        case _:
-            default_message = await get_localized_message(language, "default_message")
-            await message.answer(default_message, reply_markup=main_menu_k)
+MENU_HANDLERS = {
+    "add_meal_btn": open_meal_photo,
+    "settings_btn": open_settings,
+    "change_goal": open_goal_choice,
+    "change_language": open_language_choice,
+    "change_weight": open_weight_input,
+    "toggle_reminder": toggle_reminder,
+    "my_diary_btn": open_diary,
+    "help_btn": open_help,
+    "back_to_menu": back_to_menu
+}
+
+
+@dp.message()
+async def process_message(message: types.Message, state: FSMContext):
+    language = await get_language(message.from_user.id)
+
+    handler = MENU_HANDLERS.get(resolve_button(message.text), unknown_message)
+    await handler(message, state, language)
 
 
 async def main():
-    await bot(DeleteWebhook(drop_pending_updates=True))
-    await dp.start_polling(bot)
+    if config.BOT_MODE == "webhook":
+        await run_webhook()
+    else:
+        await bot(DeleteWebhook(drop_pending_updates=True))
+        await dp.start_polling(bot)
 
 
 if __name__ == "__main__":
     logging.info("Start Service")
-    asyncio.run(main())
+    if config.BOT_WORKERS > 1:
+        run_supervisor(config.BOT_WORKERS)
+    else:
+        asyncio.run(main())
     logging.info("Stop Service")
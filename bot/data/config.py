@@ -7,3 +7,86 @@ load_dotenv()
 TOKEN = os.environ['BOT_TOKEN']
 API = os.environ['API']
 GPT_TOKEN = os.environ['GPT_TOKEN']
+GPT_BASE_URL = os.getenv("GPT_BASE_URL") or None
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL") or None
+
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", 100))
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", 10))
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", 3))
+API_KEEPALIVE_TIMEOUT = float(os.getenv("API_KEEPALIVE_TIMEOUT", 30))
+API_DNS_CACHE_TTL = int(os.getenv("API_DNS_CACHE_TTL", 300))
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 300))
+VALIDATOR_CACHE_SIZE = int(os.getenv("VALIDATOR_CACHE_SIZE", 10000))
+VALIDATOR_CACHE_TTL = float(os.getenv("VALIDATOR_CACHE_TTL", 3600))
+
+DIARY_PREFETCH = os.getenv("DIARY_PREFETCH", "True").lower() == "true"
+DIARY_PREFETCH_TTL = float(os.getenv("DIARY_PREFETCH_TTL", 60))
+DIARY_PREFETCH_USERS = int(os.getenv("DIARY_PREFETCH_USERS", 10000))
+
+SAVE_PHOTOS = os.getenv("SAVE_PHOTOS", "True").lower() == "true"
+PHOTO_DIR = os.getenv("PHOTO_DIR", "image")
+PHOTO_STORAGE = os.getenv("PHOTO_STORAGE", "local")
+PHOTO_BASE_URL = os.getenv("PHOTO_BASE_URL", "")
+PHOTO_DISK_BUDGET_MB = float(os.getenv("PHOTO_DISK_BUDGET_MB", 1024))
+PHOTO_UPLOAD_CONCURRENCY = int(os.getenv("PHOTO_UPLOAD_CONCURRENCY", 4))
+PHOTO_THUMB_EDGE = int(os.getenv("PHOTO_THUMB_EDGE", 256))
+PHOTO_THUMB_QUALITY = int(os.getenv("PHOTO_THUMB_QUALITY", 70))
+
+S3_ENDPOINT = os.getenv("S3_ENDPOINT", "")
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY", "")
+S3_SECRET_KEY = os.getenv("S3_SECRET_KEY", "")
+
+GPT_CONCURRENCY = int(os.getenv("GPT_CONCURRENCY", 10))
+GPT_TIMEOUT = float(os.getenv("GPT_TIMEOUT", 60))
+GPT_CONNECT_TIMEOUT = float(os.getenv("GPT_CONNECT_TIMEOUT", 5))
+GPT_MAX_RETRIES = int(os.getenv("GPT_MAX_RETRIES", 2))
+GPT_RETRY_BASE_DELAY = float(os.getenv("GPT_RETRY_BASE_DELAY", 0.5))
+GPT_RETRY_MAX_DELAY = float(os.getenv("GPT_RETRY_MAX_DELAY", 8))
+
+PHOTO_MAX_EDGE = int(os.getenv("PHOTO_MAX_EDGE", 1024))
+PHOTO_JPEG_QUALITY = int(os.getenv("PHOTO_JPEG_QUALITY", 85))
+IMAGE_EXECUTOR = os.getenv("IMAGE_EXECUTOR", "thread")
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 4))
+
+RECOGNITION_CACHE_PATH = os.getenv("RECOGNITION_CACHE_PATH", "recognition_cache.sqlite3")
+RECOGNITION_CACHE_SIZE = int(os.getenv("RECOGNITION_CACHE_SIZE", 50000))
+RECOGNITION_CACHE_MAX_DISTANCE = int(os.getenv("RECOGNITION_CACHE_MAX_DISTANCE", 6))
+
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", 20))
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", 25))
+BROADCAST_CHAT_INTERVAL = float(os.getenv("BROADCAST_CHAT_INTERVAL", 1))
+BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", 3))
+BROADCAST_PAGE_SIZE = int(os.getenv("BROADCAST_PAGE_SIZE", 1000))
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory")
+STORAGE_PATH = os.getenv("STORAGE_PATH", "bot_state.sqlite3")
+STORAGE_MAX_ENTRIES = int(os.getenv("STORAGE_MAX_ENTRIES", 100000))
+STORAGE_FLUSH_INTERVAL = float(os.getenv("STORAGE_FLUSH_INTERVAL", 0.05))
+STORAGE_BATCH_SIZE = int(os.getenv("STORAGE_BATCH_SIZE", 100))
+STATE_TTL = int(os.getenv("STATE_TTL", 86400))
+PENDING_MEAL_TTL = int(os.getenv("PENDING_MEAL_TTL", 3600))
+
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+WEBHOOK_MAX_IN_FLIGHT = int(os.getenv("WEBHOOK_MAX_IN_FLIGHT", 100))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 40))
+
+if BOT_MODE == "webhook" and not WEBHOOK_SECRET:
+    raise RuntimeError("WEBHOOK_SECRET must be set when BOT_MODE=webhook")
+
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", 1))
+WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", 1000))
+WORKER_MAX_IN_FLIGHT = int(os.getenv("WORKER_MAX_IN_FLIGHT", 100))
+WORKER_DRAIN_TIMEOUT = float(os.getenv("WORKER_DRAIN_TIMEOUT", 30))
+WORKER_STATS_INTERVAL = float(os.getenv("WORKER_STATS_INTERVAL", 60))
+POLLING_TIMEOUT = int(os.getenv("POLLING_TIMEOUT", 30))
+
+USER_QUEUE_DEPTH = int(os.getenv("USER_QUEUE_DEPTH", 5))
@@ -1,6 +1,41 @@
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 
 from data import config
+from utils.api_client import ApiClient
+from utils.images import shutdown_executor
+from utils.middlewares import UserSerialMiddleware
+from utils.photo_storage import close_photo_storage
+from utils.recognition_cache import close_recognition_cache
+from utils.storage import KeyValueFSMStorage, create_store
+from utils.utils import close_gpt_client
 
-bot = Bot(token=config.TOKEN)
-dp = Dispatcher(bot=bot)
+if config.TELEGRAM_API_URL:
+    bot = Bot(token=config.TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(config.TELEGRAM_API_URL)))
+else:
+    bot = Bot(token=config.TOKEN)
+dp = Dispatcher(bot=bot, storage=KeyValueFSMStorage(create_store("fsm", config.STATE_TTL)))
+
+pending_meals = create_store("pending_meals", config.PENDING_MEAL_TTL)
+
+user_serial_middleware = UserSerialMiddleware(max_queue_depth=config.USER_QUEUE_DEPTH)
+dp.update.outer_middleware(user_serial_middleware)
+
+api_client = ApiClient(
+    headers={"Auth": config.TOKEN},
+    pool_size=config.API_POOL_SIZE,
+    timeout=config.API_TIMEOUT,
+    connect_timeout=config.API_CONNECT_TIMEOUT,
+    keepalive_timeout=config.API_KEEPALIVE_TIMEOUT,
+    dns_cache_ttl=config.API_DNS_CACHE_TTL
+)
+
+dp.startup.register(api_client.start)
+dp.shutdown.register(api_client.close)
+dp.shutdown.register(close_gpt_client)
+dp.shutdown.register(shutdown_executor)
+dp.shutdown.register(close_recognition_cache)
+dp.shutdown.register(close_photo_storage)
+dp.shutdown.register(pending_meals.close)
+dp.shutdown.register(dp.storage.close)
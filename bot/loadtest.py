@@ -0,0 +1,370 @@
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+import aiohttp
+
+from aiohttp import web
+from PIL import Image
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN = "123456:LOADTEST-loadtest-loadtest-loadtest"
+
+MEAL = {"food_name": "plov", "grams": 250, "calories": 480, "protein": 14, "fat": 21, "carbs": 58}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Feed synthetic updates through the dispatcher against local stand-ins")
+    parser.add_argument("--users", type=int, default=100, help="virtual users, each runs the full scenario once")
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users active at the same time")
+    parser.add_argument("--navigation-steps", type=int, default=5, help="diary ◀️ taps per user")
+    parser.add_argument("--photo-variants", type=int, default=20, help="distinct images served to users")
+    parser.add_argument("--gpt-latency", type=float, default=0.5, help="fake OpenAI response time, seconds")
+    parser.add_argument("--telegram-latency", type=float, default=0.02, help="fake Bot API response time, seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def make_photo(seed):
+    rng = random.Random(seed)
+    image = Image.new("RGB", (1280, 960))
+    image.putdata([
+        (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        for _ in range(1280 * 960 // 64)
+    ] * 64)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+class FakeTelegram:
+    def __init__(self, photos, latency, error_text):
+        self.photos = photos
+        self.latency = latency
+        self.error_text = error_text
+        self.calls = Counter()
+        self.error_replies = 0
+        self._message_ids = itertools.count(1_000_000)
+
+    def create_app(self):
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle_method)
+        app.router.add_get("/file/bot{token}/{path:.*}", self.handle_file)
+        return app
+
+    async def handle_method(self, request):
+        method = request.match_info["method"]
+        data = await request.post()
+        self.calls[method] += 1
+        await asyncio.sleep(self.latency)
+
+        if method in ("sendMessage", "editMessageText"):
+            if data.get("text") == self.error_text:
+                self.error_replies += 1
+            result = {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(data["chat_id"]), "type": "private"},
+                "text": data.get("text", "")
+            }
+        elif method == "getFile":
+            result = {
+                "file_id": data["file_id"],
+                "file_unique_id": data["file_id"],
+                "file_path": f"photos/{data['file_id']}.jpg"
+            }
+        else:
+            result = True
+
+        return web.json_response({"ok": True, "result": result})
+
+    async def handle_file(self, request):
+        self.calls["download"] += 1
+        variant = int(request.match_info["path"].split("-")[-1].split(".")[0])
+        return web.Response(body=self.photos[variant % len(self.photos)], content_type="image/jpeg")
+
+
+class FakeOpenAI:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def create_app(self):
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self.handle_completion)
+        return app
+
+    async def handle_completion(self, request):
+        await request.read()
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+        return web.json_response({
+            "id": f"chatcmpl-{self.calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-4o",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(MEAL)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        })
+
+
+class DjangoServer:
+    def __init__(self, workdir, port):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}/api/"
+        self.env = {
+            **os.environ,
+            "BOT_TOKEN": TOKEN,
+            "SQLITE_PATH": os.path.join(workdir, "api.sqlite3"),
+            "SYNC_USER_MODELS": "true"
+        }
+        self.process = None
+        self.log = open(os.path.join(workdir, "django.log"), "wb")
+
+    def start(self):
+        subprocess.run(
+            [sys.executable, "manage.py", "migrate", "--run-syncdb", "--verbosity", "0"],
+            cwd=ROOT_DIR, env=self.env, check=True
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, "manage.py", "runserver", f"127.0.0.1:{self.port}", "--noreload"],
+            cwd=ROOT_DIR, env=self.env, stdout=self.log, stderr=subprocess.STDOUT
+        )
+
+    async def wait_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        async with aiohttp.ClientSession(headers={"Auth": TOKEN}) as session:
+            while time.monotonic() < deadline:
+                try:
+                    async with session.get(f"{self.url}stats/") as response:
+                        if response.status == 200:
+                            return
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError(f"Django API did not start, see {self.log.name}")
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+        self.log.close()
+
+
+class UpdateFactory:
+    def __init__(self, bot_id):
+        self.bot_id = bot_id
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    @staticmethod
+    def _user(user_id):
+        return {"id": user_id, "is_bot": False, "first_name": f"load-{user_id}"}
+
+    @staticmethod
+    def _chat(user_id):
+        return {"id": user_id, "type": "private"}
+
+    def message(self, user_id, **fields):
+        return {
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": self._chat(user_id),
+                "from": self._user(user_id),
+                **fields
+            }
+        }
+
+    def text(self, user_id, text):
+        entities = [{"type": "bot_command", "offset": 0, "length": len(text)}] if text.startswith("/") else None
+        if entities:
+            return self.message(user_id, text=text, entities=entities)
+        return self.message(user_id, text=text)
+
+    def photo(self, user_id, variant):
+        return self.message(user_id, photo=[{
+            "file_id": f"photo-{user_id}-{variant}",
+            "file_unique_id": f"unique-{user_id}",
+            "width": 1280,
+            "height": 960
+        }])
+
+    def callback(self, user_id, data):
+        return {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self._user(user_id),
+                "chat_instance": "loadtest",
+                "data": data,
+                "message": {
+                    "message_id": next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": self._chat(user_id),
+                    "from": {"id": self.bot_id, "is_bot": True, "first_name": "bot"},
+                    "text": "card"
+                }
+            }
+        }
+
+
+class LoadTest:
+    def __init__(self, args, bot, dp, types):
+        self.args = args
+        self.bot = bot
+        self.dp = dp
+        self.types = types
+        self.updates = UpdateFactory(bot.id)
+        self.samples = defaultdict(list)
+        self.errors = Counter()
+
+    async def feed(self, label, payload):
+        update = self.types.Update.model_validate(payload, context={"bot": self.bot})
+        started_at = time.perf_counter()
+
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception:
+            self.errors[label] += 1
+        finally:
+            self.samples[label].append(time.perf_counter() - started_at)
+
+    async def scenario(self, user_id):
+        updates = self.updates
+        today = date.today()
+
+        await self.feed("start", updates.text(user_id, "/start"))
+        await self.feed("choose_language", updates.callback(user_id, "ru"))
+        await self.feed("photo", updates.photo(user_id, user_id % self.args.photo_variants))
+        await self.feed("save_meal", updates.callback(user_id, "save_meal"))
+        await self.feed("my_diary", updates.text(user_id, "📔 Мой дневник"))
+
+        for step in range(1, self.args.navigation_steps + 1):
+            day = today - timedelta(days=step)
+            await self.feed("diary_navigation", updates.callback(user_id, f"diary_prev_{day:%Y-%m-%d}"))
+
+        await self.feed("settings", updates.text(user_id, "⚙️ Настройки"))
+        await self.feed("week_report", updates.text(user_id, "/week"))
+
+    async def run(self):
+        slots = asyncio.Semaphore(self.args.concurrency)
+
+        async def run_user(user_id):
+            async with slots:
+                await self.scenario(user_id)
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(run_user(10_000 + index) for index in range(self.args.users)))
+        return time.perf_counter() - started_at
+
+    def report(self, elapsed, telegram, openai_fake):
+        total = sum(len(samples) for samples in self.samples.values())
+
+        print(f"\n{self.args.users} users, concurrency {self.args.concurrency}: "
+              f"{total} updates in {elapsed:.2f}s ({total / elapsed:.1f} updates/s)\n")
+        print(f"{'handler':<18}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+
+        for label, samples in self.samples.items():
+            print(
+                f"{label:<18}{len(samples):>7}{self.errors[label]:>8}"
+                f"{percentile(samples, 50) * 1000:>10.1f}{percentile(samples, 95) * 1000:>10.1f}"
+                f"{percentile(samples, 99) * 1000:>10.1f}{max(samples) * 1000:>10.1f}"
+            )
+
+        print(f"\nBot API calls: {dict(telegram.calls)}")
+        print(f"Error replies sent to users: {telegram.error_replies}")
+        print(f"OpenAI calls: {openai_fake.calls}")
+
+
+async def serve(app, port):
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def main(args):
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+        telegram_port, openai_port, django_port = free_port(), free_port(), free_port()
+
+        os.environ.update({
+            "BOT_TOKEN": TOKEN,
+            "GPT_TOKEN": "loadtest",
+            "API": f"http://127.0.0.1:{django_port}/api/",
+            "TELEGRAM_API_URL": f"http://127.0.0.1:{telegram_port}",
+            "GPT_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+            "STORAGE_BACKEND": "memory",
+            "PHOTO_DIR": os.path.join(workdir, "photos"),
+            "RECOGNITION_CACHE_PATH": os.path.join(workdir, "recognition.sqlite3")
+        })
+
+        # The bot reads its configuration at import time, so it is imported
+        # only after the stand-ins' addresses are in the environment.
+        from aiogram import types
+        from loader import bot, dp
+        from utils.translation.localization import Localization
+        import bot as bot_handlers  # noqa: F401
+
+        photos = [make_photo(args.seed + variant) for variant in range(args.photo_variants)]
+        telegram = FakeTelegram(photos, args.telegram_latency, Localization.get_translation("none", "error"))
+        openai_fake = FakeOpenAI(args.gpt_latency)
+        django = DjangoServer(workdir, django_port)
+
+        runners = [
+            await serve(telegram.create_app(), telegram_port),
+            await serve(openai_fake.create_app(), openai_port)
+        ]
+
+        try:
+            django.start()
+            await django.wait_ready()
+            await dp.emit_startup(bot=bot, bots=[bot], dispatcher=dp)
+
+            load_test = LoadTest(args, bot, dp, types)
+            elapsed = await load_test.run()
+            load_test.report(elapsed, telegram, openai_fake)
+        finally:
+            await dp.emit_shutdown(bot=bot, bots=[bot], dispatcher=dp)
+            await bot.session.close()
+            for runner in runners:
+                await runner.cleanup()
+            django.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
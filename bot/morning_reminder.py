@@ -1,82 +1,163 @@
 import asyncio
-import aiohttp
+import time
 
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
-from loader import bot
-from utils.keyboards import main_menu_keyboard
-from utils.translation.localization import get_localized_message
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
 
-from data import config
+from loader import api_client, bot
+from utils.fetch import update_user_reminder
+from utils.rate_limit import ChatRateLimiter, TokenBucket
+from utils.ui import get_ui
 
+from data import config
 
-token = config.TOKEN
 
 API = config.API
 
-HEADERS = {
-    "Auth": token
-}
+PERMANENT_CHAT_ERRORS = (
+    "chat not found",
+    "user is deactivated",
+    "bot was blocked",
+    "bot was kicked",
+)
+
+
+@dataclass
+class BroadcastReport:
+    total: int = 0
+    sent: int = 0
+    failed: int = 0
+    disabled: int = 0
+    retried: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self):
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f"📊 Рассылка завершена за {self.elapsed:.1f} с: "
+            f"всего {self.total}, отправлено {self.sent}, "
+            f"ошибок {self.failed}, отключено {self.disabled}, повторов {self.retried} "
+            f"({self.throughput:.1f} сообщ./с)"
+        )
+
+
+class MorningBroadcaster:
+    def __init__(self, workers=None, rate=None, chat_interval=None, max_retries=None):
+        self.workers = workers or config.BROADCAST_WORKERS
+        self.max_retries = config.BROADCAST_MAX_RETRIES if max_retries is None else max_retries
+        self.bucket = TokenBucket(rate or config.BROADCAST_RATE)
+        self.chat_limiter = ChatRateLimiter(chat_interval or config.BROADCAST_CHAT_INTERVAL)
+        self.report = BroadcastReport()
+
+    async def run(self, pages):
+        started_at = time.monotonic()
+
+        queue = asyncio.Queue(maxsize=self.workers * 4)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.workers)]
+
+        try:
+            async for diaries in pages:
+                for diary in diaries:
+                    self.report.total += 1
+                    await queue.put(diary)
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+        self.report.elapsed = time.monotonic() - started_at
+        return self.report
+
+    async def _worker(self, queue):
+        while True:
+            diary = await queue.get()
+            if diary is None:
+                return
 
+            try:
+                await self._process_diary(diary)
+            except Exception as e:
+                self.report.failed += 1
+                print(f"❌ Ошибка обработки {diary.get('telegram_id')}: {e}")
 
-async def send_morning_summary_to_all_users():
-    yesterday = datetime.now().date() - timedelta(days=1)
-    year, month, day = yesterday.year, yesterday.month, yesterday.day
+    async def _process_diary(self, diary):
+        ui = get_ui(diary.get("language"))
 
-    url = f"{API}users/reminder"
+        await self._send(diary["telegram_id"], ui.render_summary_card(diary), ui.main_menu)
 
+    async def _send(self, telegram_id, text, keyboard):
+        try:
+            for attempt in range(self.max_retries + 1):
+                await self.chat_limiter.wait(telegram_id)
+                await self.bucket.acquire()
 
-    async with aiohttp.ClientSession(headers=HEADERS) as session:
-        async with session.get(url=url) as response:
-            if response.status != 200:
-                print("❌ Не удалось получить список пользователей")
-                return
-            
-            users = await response.json()
+                try:
+                    await bot.send_message(chat_id=telegram_id, text=text, reply_markup=keyboard, parse_mode="html")
+                    self.report.sent += 1
+                    return
 
-        for user in users:
-            user_id = user["id"]
-            telegram_id = user["telegram_id"]
-            language = user.get("language", "ru")
+                except TelegramRetryAfter as e:
+                    self.report.retried += 1
+                    self.bucket.pause(e.retry_after)
 
-            url_diary = f"{API}diary/date/{user_id}/{year}/{month}/{day}"
+                except TelegramForbiddenError as e:
+                    await self._disable(telegram_id, e)
+                    return
 
-            async with session.get(url=url_diary) as resp:
-                if resp.status != 200:
-                    continue
+                except TelegramBadRequest as e:
+                    if any(error in e.message.lower() for error in PERMANENT_CHAT_ERRORS):
+                        await self._disable(telegram_id, e)
+                    else:
+                        self.report.failed += 1
+                        print(f"❌ Ошибка отправки {telegram_id}: {e}")
+                    return
 
-                diaries = await resp.json()
-                if not diaries:
-                    continue
+            self.report.failed += 1
+            print(f"❌ Превышено число повторов для {telegram_id}")
+        finally:
+            self.chat_limiter.release(telegram_id)
 
-                diary = diaries[0]
+    async def _disable(self, telegram_id, error):
+        self.report.disabled += 1
+        print(f"🚫 Чат {telegram_id} недоступен ({error}), напоминание отключено")
+        await update_user_reminder(telegram_id, False)
 
-            calorie_text = await get_localized_message(language, "calorie")
-            protein_text = await get_localized_message(language, "protein")
-            fat_text = await get_localized_message(language, "fat")
-            carbs_text = await get_localized_message(language, "carbs")
-            summary_text = await get_localized_message(language, "summary_text")
 
-            total_kcal = diary.get("total_calories", 0)
-            total_protein = diary.get("total_protein", 0)
-            total_fat = diary.get("total_fat", 0)
-            total_carbs = diary.get("total_carbs", 0)
+async def iter_diary_summaries(date):
+    url = f"{API}diary/summaries/{date.year}/{date.month}/{date.day}?page_size={config.BROADCAST_PAGE_SIZE}"
 
-            diary_text = (
-                f"<b>{summary_text}</b>\n\n"
-                f"🔥 {calorie_text}: <b>{total_kcal} kkal</b>\n"
-                f"🍗 {protein_text}: <b>{total_protein} g</b>\n"
-                f"🥑 {fat_text}: <b>{total_fat} g</b>\n"
-                f"🍞 {carbs_text}: <b>{total_carbs} g</b>"
-            )
+    while url:
+        async with api_client.get(url=url) as response:
+            if response.status != 200:
+                print("❌ Не удалось получить список дневников")
+                return
 
-            keyboard = await main_menu_keyboard(language)
+            page = await response.json()
+
+        yield page["results"]
+        url = page["next"]
+
+
+async def send_morning_summary_to_all_users():
+    yesterday = datetime.now().date() - timedelta(days=1)
+
+    report = await MorningBroadcaster().run(iter_diary_summaries(yesterday))
+    print(report)
+    return report
+
+
+async def main():
+    try:
+        await send_morning_summary_to_all_users()
+    finally:
+        await api_client.close()
+        await bot.session.close()
 
-            try:
-                await bot.send_message(chat_id=telegram_id, text=diary_text, reply_markup=keyboard, parse_mode="html")
-                print(f"✅ Сводка отправлена {telegram_id}")
-            except Exception as e:
-                print(f"❌ Ошибка отправки {telegram_id}: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(send_morning_summary_to_all_users())
+    asyncio.run(main())
@@ -1,27 +1,62 @@
-import aiohttp
+import json
 
-from datetime import date
 from data import config
-
-token = config.TOKEN
+from loader import api_client
+from utils.cache import TTLCache
+from utils.prefetch import DiaryPrefetcher
 
 API = config.API
 
-HEADERS = {
-    "Auth": token
-}
+user_cache = TTLCache(maxsize=config.USER_CACHE_SIZE, ttl=config.USER_CACHE_TTL)
+validator_cache = TTLCache(maxsize=config.VALIDATOR_CACHE_SIZE, ttl=config.VALIDATOR_CACHE_TTL)
+conditional_stats = {"not_modified": 0, "modified": 0}
 
 
-async def get_user_data(telegram_id):
+async def _get_json(url):
+    cached = validator_cache.get(url)
+    headers = {"If-None-Match": cached[0]} if cached else None
+
+    async with api_client.get(url, headers=headers) as response:
+        if response.status == 304 and cached:
+            conditional_stats["not_modified"] += 1
+            return cached[1]
+
+        if response.status == 200:
+            conditional_stats["modified"] += 1
+            data = await response.json()
+            etag = response.headers.get("ETag")
+            if etag:
+                validator_cache.set(url, (etag, data))
+            return data
+
+        return None
+
+
+async def _fetch_user(telegram_id):
+    user = user_cache.get(telegram_id)
+    if user is not None:
+        return user
+
+    user = await _get_json(f"{API}users/telegram/{telegram_id}")
+    if user is not None:
+        user_cache.set(telegram_id, user)
+    return user
+
+
+async def _update_user(telegram_id, data):
     url = f"{API}users/telegram/{telegram_id}"
 
-    async with aiohttp.ClientSession(headers=HEADERS) as session:
-        async with session.get(url) as response:
-            response_data = None
-            if response.status == 200:
-                response_data = await response.json()
-            
-            return response_data
+    async with api_client.patch(url=url, data=data) as response:
+        response_code = response.status
+        if response_code == 200:
+            user_cache.set(telegram_id, await response.json())
+        else:
+            user_cache.pop(telegram_id)
+        return response_code
+
+
+async def get_user_data(telegram_id):
+    return await _fetch_user(telegram_id)
 
 
 async def create_user_data(telegram_id: int, language: str):
@@ -32,159 +67,98 @@ async def create_user_data(telegram_id: int, language: str):
         "language": language
     }
 
-    async with aiohttp.ClientSession(headers=HEADERS) as session:
-        async with session.post(url=url, data=data) as response:
-            response_code = response.status
-            if response_code == 201 or response_code == 200:
-                data = await response.json()
-                return data
-            return None
+    async with api_client.post(url=url, data=data) as response:
+        response_code = response.status
+        if response_code == 201 or response_code == 200:
+            data = await response.json()
+            user_cache.set(telegram_id, data)
+            return data
+        return None
 
 
 async def get_language(telegram_id: int):
-    url = f"{API}users/telegram/{telegram_id}"
-
-    async with aiohttp.ClientSession(headers=HEADERS) as session:
-        async with session.get(url=url) as response:
-            response_code = response.status
-            if response_code == 200:
-                data = await response.json()
-                language = data['language']
-                return language
-            return None            
-
-
-async def create_meal_data(diary_id, food_name: str, grams, calories, photo_path: str, protein, fat, carbs, ai_raw_json):
-    url = f"{API}meal/"
-
-    data = {
-        "food_name": food_name,
-        "grams": grams,
-        "calories": calories,
-        "protein": protein,
-        "fat": fat,
-        "carbs": carbs,
+    data = await _fetch_user(telegram_id)
+    if data is not None:
+        return data['language']
+    return None
+
+
+async def log_meal(telegram_id, meal, photo_path, idempotency_key):
+    url = f"{API}users/telegram/{telegram_id}/meals/today"
+
+    payload = {
+        "food_name": meal["food_name"],
+        "grams": meal.get("grams", 100),
+        "calories": meal["calories"],
+        "protein": meal["protein"],
+        "fat": meal["fat"],
+        "carbs": meal["carbs"],
         "image_url": photo_path,
-        "ai_raw_json": ai_raw_json,
-        "diary": diary_id
+        "ai_raw_json": json.dumps(meal, ensure_ascii=False)[:400],
+        "idempotency_key": idempotency_key
     }
 
-    async with aiohttp.ClientSession(headers=HEADERS) as session:
-        async with session.post(url=url, data=data) as response:
-            response_code = response.status
-            if response_code == 201 or response_code == 200:
-                data = await response.json()
-                return data
-            return None
+    async with api_client.post(url=url, json=payload) as response:
+        if response.status == 201 or response.status == 200:
+            return await response.json()
+        return None
 
 
 async def get_settings(telegram_id):
-    url = f"{API}users/telegram/{telegram_id}"
-
-    async with aiohttp.ClientSession(headers=HEADERS) as session:
-        async with session.get(url=url) as response:
-            if response.status == 200:
-                response_data = await response.json()
-                return response_data
-            return None
+    return await _fetch_user(telegram_id)
 
 
 async def update_user_goal(telegram_id, goal_code):
-    url = f"{API}users/telegram/{telegram_id}"
-
     data = {
         "goal": goal_code
     }
 
-    async with aiohttp.ClientSession(headers=HEADERS) as session:
-        async with session.patch(url=url, data=data) as response:
-            response_code = response.status
-            return response_code
+    return await _update_user(telegram_id, data)
         
     
 async def update_user_weight(telegram_id, weight):
-    url = f"{API}users/telegram/{telegram_id}"
-
     data = {
         "weight_kg": weight
     }
 
-    async with aiohttp.ClientSession(headers=HEADERS) as session:
-        async with session.patch(url=url, data=data) as response:
-            response_code = response.status
-            return response_code
+    return await _update_user(telegram_id, data)
         
 
 async def update_user_language(telegram_id, language):
-    url = f"{API}users/telegram/{telegram_id}"
-
     data = {
         "language": language
     }
 
-    async with aiohttp.ClientSession(headers=HEADERS) as session:
-        async with session.patch(url=url, data=data) as response:
-            response_code = response.status
-            return response_code
+    return await _update_user(telegram_id, data)
         
 
 async def update_user_reminder(telegram_id, reminder):
-    url = f"{API}users/telegram/{telegram_id}"
-
     data = {
         "morning_summary_enabled": reminder
     }
 
-    async with aiohttp.ClientSession(headers=HEADERS) as session:
-        async with session.patch(url=url, data=data) as response:
-            response_code = response.status
-            return response_code
+    return await _update_user(telegram_id, data)
 
 
-async def get_diary_data_by_date(user_id, year, month, day):
-    url = f"{API}diary/date/{user_id}/{year}/{month}/{day}"
+async def get_context(telegram_id, day):
+    context = await _get_json(f"{API}users/telegram/{telegram_id}/context/{day.year}/{day.month}/{day.day}")
+    if context is not None:
+        user_cache.set(telegram_id, context["user"])
+    return context
 
-    async with aiohttp.ClientSession(headers=HEADERS) as session:
-        async with session.get(url=url) as response:
-            if response.status == 200:
-                data = await response.json()
-                if isinstance(data, list) and data:
-                    return data[0]
-                else:
-                    return None
-            return None
-        
 
-async def get_or_create_diary(user_id):
-    today = date.today()
-    url = f"{API}diary/date/{user_id}/{today.year}/{today.month}/{today.day}"
-
-    async with aiohttp.ClientSession(headers=HEADERS) as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                data = await response.json()
-                if data:
-                    return data[0]["id"]
-
-
-        payload = {
-            "user": user_id,
-            "date": str(today)
-        }
-        async with session.post(f"{API}diary/", json=payload) as create_response:
-            if create_response.status == 201:
-                created = await create_response.json()
-                return created["id"]
-            else:
-                return None
-            
+diary_prefetcher = DiaryPrefetcher(get_context, ttl=config.DIARY_PREFETCH_TTL, max_users=config.DIARY_PREFETCH_USERS)
+
+
+async def get_diary_range(telegram_id, start, end):
+    return await _get_json(f"{API}users/telegram/{telegram_id}/diary/range/{start.isoformat()}/{end.isoformat()}")
+
 
 async def get_user_stats():
     url = f"{API}stats/"
 
-    async with aiohttp.ClientSession(headers=HEADERS) as session:
-        async with session.get(url=url) as response:
-            if response.status == 200:
-                response_data = await response.json()
-                return response_data
-            return None
+    async with api_client.get(url=url) as response:
+        if response.status == 200:
+            response_data = await response.json()
+            return response_data
+        return None
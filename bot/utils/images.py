@@ -0,0 +1,114 @@
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+
+from PIL import Image, UnidentifiedImageError
+
+from data import config
+
+
+if config.IMAGE_EXECUTOR == "process":
+    _executor = ProcessPoolExecutor(max_workers=config.IMAGE_WORKERS)
+else:
+    _executor = ThreadPoolExecutor(max_workers=config.IMAGE_WORKERS, thread_name_prefix="image")
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    data: bytes
+    base64: str
+    original_size: int
+    phash: int | None = None
+    sha256: str = ""
+    thumbnail: bytes | None = None
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    @property
+    def bytes_saved(self):
+        return self.original_size - self.size
+
+
+def select_photo_size(photos, min_edge=None):
+    min_edge = min_edge or config.PHOTO_MAX_EDGE
+    photos = sorted(photos, key=lambda photo: photo.width * photo.height)
+
+    for photo in photos:
+        if max(photo.width, photo.height) >= min_edge:
+            return photo
+    return photos[-1]
+
+
+def difference_hash(image, hash_size=8):
+    pixels = list(image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS).getdata())
+
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def _encode_jpeg(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _prepare_image(image_bytes, max_edge, quality, thumb_edge=None, thumb_quality=70):
+    data = image_bytes
+    phash = None
+    thumbnail = None
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image = image.convert("RGB")
+            phash = difference_hash(image)
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+            encoded = _encode_jpeg(image, quality)
+
+            if thumb_edge:
+                image.thumbnail((thumb_edge, thumb_edge), Image.LANCZOS)
+                thumbnail = _encode_jpeg(image, thumb_quality)
+
+        if len(encoded) < len(image_bytes):
+            data = encoded
+    except (UnidentifiedImageError, OSError):
+        pass
+
+    return PreparedImage(
+        data=data,
+        base64=base64.b64encode(data).decode("utf-8"),
+        original_size=len(image_bytes),
+        phash=phash,
+        sha256=hashlib.sha256(data).hexdigest(),
+        thumbnail=thumbnail
+    )
+
+
+async def prepare_image(image_bytes):
+    loop = asyncio.get_running_loop()
+    prepared = await loop.run_in_executor(
+        _executor, _prepare_image, image_bytes, config.PHOTO_MAX_EDGE, config.PHOTO_JPEG_QUALITY,
+        config.PHOTO_THUMB_EDGE, config.PHOTO_THUMB_QUALITY
+    )
+
+    logging.info(
+        f"Image prepared: {prepared.original_size} -> {prepared.size} bytes "
+        f"({prepared.bytes_saved} saved)"
+    )
+    return prepared
+
+
+async def shutdown_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,70 @@
+import asyncio
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import Update
+
+from utils.translation.localization import get_localized_message
+
+
+class _UserQueue:
+    __slots__ = ("lock", "depth")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.depth = 0
+
+
+class UserSerialMiddleware(BaseMiddleware):
+    def __init__(self, max_queue_depth=5):
+        self.max_queue_depth = max_queue_depth
+        self.rejected = 0
+        self._queues: Dict[int, _UserQueue] = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        queue = self._queues.get(user.id)
+        if queue is None:
+            queue = self._queues[user.id] = _UserQueue()
+
+        if queue.depth >= self.max_queue_depth:
+            self.rejected += 1
+            await self._reject(event)
+            return None
+
+        queue.depth += 1
+        try:
+            async with queue.lock:
+                return await handler(event, data)
+        finally:
+            queue.depth -= 1
+            if queue.depth == 0:
+                self._queues.pop(user.id, None)
+
+    async def _reject(self, event: Update):
+        text = await get_localized_message("none", "too_many_requests")
+
+        try:
+            if event.callback_query:
+                await event.callback_query.answer(text)
+            elif event.message:
+                await event.message.answer(text)
+        except TelegramAPIError:
+            pass
+
+    def stats(self):
+        return {
+            "active_users": len(self._queues),
+            "queued": sum(queue.depth for queue in self._queues.values()),
+            "rejected": self.rejected
+        }
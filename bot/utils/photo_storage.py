@@ -0,0 +1,319 @@
+import asyncio
+import datetime
+import hashlib
+import hmac
+import logging
+import os
+import time
+
+from urllib.parse import parse_qsl, quote, urlsplit
+
+import aiofiles
+import aiofiles.os
+import aiohttp
+
+from data import config
+
+
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+
+def content_key(digest, kind="photos"):
+    return f"{kind}/{digest[:2]}/{digest}.jpg"
+
+
+class PhotoStorage:
+    async def exists(self, key):
+        raise NotImplementedError
+
+    async def put(self, key, data):
+        raise NotImplementedError
+
+    async def touch(self, key):
+        pass
+
+    def url(self, key):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class LocalPhotoStorage(PhotoStorage):
+    def __init__(self, root, base_url=None, max_bytes=None, low_water=0.9):
+        self.root = root
+        self.base_url = base_url
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.evicted = 0
+        self._used = None
+        self._evict_lock = asyncio.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    def url(self, key):
+        if self.base_url:
+            return f"{self.base_url.rstrip('/')}/{key}"
+        return self._path(key)
+
+    async def exists(self, key):
+        return await aiofiles.os.path.exists(self._path(key))
+
+    async def touch(self, key):
+        try:
+            await asyncio.to_thread(os.utime, self._path(key))
+        except FileNotFoundError:
+            pass
+
+    async def put(self, key, data):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+        async with aiofiles.open(tmp_path, "wb") as f:
+            await f.write(data)
+        await aiofiles.os.replace(tmp_path, path)
+
+        if self._used is not None:
+            self._used += len(data)
+        if self.max_bytes:
+            await self.enforce_budget()
+
+    def _scan(self):
+        files = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _evict(self):
+        files = self._scan()
+        used = sum(size for _, size, _ in files)
+        removed = 0
+
+        if used > self.max_bytes:
+            target = self.max_bytes * self.low_water
+            for _, size, path in sorted(files):
+                if used <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                used -= size
+                removed += 1
+
+        return used, removed
+
+    async def enforce_budget(self):
+        if self._used is not None and self._used <= self.max_bytes:
+            return
+
+        async with self._evict_lock:
+            self._used, removed = await asyncio.to_thread(self._evict)
+
+        if removed:
+            self.evicted += removed
+            logging.info(f"Photo storage over budget, evicted {removed} files ({self._used} bytes left)")
+
+
+def _hmac_sha256(key, message):
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+
+def sign_v4(method, url, headers, payload_hash, access_key, secret_key, region, service="s3", now=None):
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    date_stamp = now.strftime("%Y%m%d")
+    parts = urlsplit(url)
+
+    headers = {
+        **headers,
+        "host": parts.netloc,
+        "x-amz-date": amz_date,
+        "x-amz-content-sha256": payload_hash
+    }
+    canonical = sorted((name.lower(), " ".join(str(value).split())) for name, value in headers.items())
+    signed_headers = ";".join(name for name, _ in canonical)
+
+    canonical_query = "&".join(
+        f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+        for name, value in sorted(parse_qsl(parts.query, keep_blank_values=True))
+    )
+    canonical_request = "\n".join([
+        method,
+        parts.path or "/",
+        canonical_query,
+        "".join(f"{name}:{value}\n" for name, value in canonical),
+        signed_headers,
+        payload_hash
+    ])
+
+    scope = f"{date_stamp}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256",
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+    ])
+
+    signing_key = ("AWS4" + secret_key).encode("utf-8")
+    for part in (date_stamp, region, service, "aws4_request"):
+        signing_key = _hmac_sha256(signing_key, part)
+    signature = hmac.new(signing_key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    headers["Authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+    return headers
+
+
+class S3PhotoStorage(PhotoStorage):
+    def __init__(self, endpoint, bucket, access_key, secret_key, region="us-east-1", base_url=None, timeout=30):
+        self.endpoint = endpoint.rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.base_url = base_url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+        return self._session
+
+    def _object_url(self, key):
+        return f"{self.endpoint}/{self.bucket}/{quote(key, safe='/-_.~')}"
+
+    def _signed(self, method, key, payload_hash=EMPTY_SHA256, headers=None):
+        url = self._object_url(key)
+        return url, sign_v4(
+            method, url, headers or {}, payload_hash,
+            self.access_key, self.secret_key, self.region
+        )
+
+    def url(self, key):
+        if self.base_url:
+            return f"{self.base_url.rstrip('/')}/{key}"
+        return self._object_url(key)
+
+    async def exists(self, key):
+        url, headers = self._signed("HEAD", key)
+        async with self.session.head(url, headers=headers) as response:
+            return response.status == 200
+
+    async def put(self, key, data):
+        url, headers = self._signed(
+            "PUT", key, hashlib.sha256(data).hexdigest(), {"content-type": "image/jpeg"}
+        )
+        async with self.session.put(url, data=data, headers=headers) as response:
+            if response.status >= 300:
+                raise aiohttp.ClientResponseError(
+                    response.request_info, response.history,
+                    status=response.status, message=await response.text()
+                )
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class PhotoUploader:
+    def __init__(self, storage: PhotoStorage, concurrency=4):
+        self.storage = storage
+        self.uploaded = 0
+        self.deduplicated = 0
+        self.failed = 0
+        self.bytes_uploaded = 0
+        self._slots = asyncio.Semaphore(concurrency)
+        self._in_flight = {}
+
+    def ingest(self, image):
+        key = content_key(image.sha256)
+
+        self._schedule(key, image.data)
+        if image.thumbnail:
+            self._schedule(content_key(image.sha256, "thumbs"), image.thumbnail)
+
+        return self.storage.url(key)
+
+    def _schedule(self, key, data):
+        if key in self._in_flight:
+            self.deduplicated += 1
+            return
+
+        task = asyncio.create_task(self._upload(key, data))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+    async def _upload(self, key, data):
+        async with self._slots:
+            started_at = time.monotonic()
+            try:
+                if await self.storage.exists(key):
+                    self.deduplicated += 1
+                    await self.storage.touch(key)
+                    return
+
+                await self.storage.put(key, data)
+                self.uploaded += 1
+                self.bytes_uploaded += len(data)
+                logging.info(f"Photo {key} stored ({len(data)} bytes, {time.monotonic() - started_at:.2f}s)")
+            except (OSError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.failed += 1
+                logging.warning(f"Photo upload {key} failed: {e}")
+
+    async def drain(self):
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+
+    async def close(self):
+        await self.drain()
+        await self.storage.close()
+
+    def stats(self):
+        return {
+            "uploaded": self.uploaded,
+            "deduplicated": self.deduplicated,
+            "failed": self.failed,
+            "bytes_uploaded": self.bytes_uploaded,
+            "in_flight": len(self._in_flight)
+        }
+
+
+def create_photo_storage():
+    if config.PHOTO_STORAGE == "s3":
+        return S3PhotoStorage(
+            config.S3_ENDPOINT,
+            config.S3_BUCKET,
+            config.S3_ACCESS_KEY,
+            config.S3_SECRET_KEY,
+            region=config.S3_REGION,
+            base_url=config.PHOTO_BASE_URL or None
+        )
+    return LocalPhotoStorage(
+        config.PHOTO_DIR,
+        base_url=config.PHOTO_BASE_URL or None,
+        max_bytes=int(config.PHOTO_DISK_BUDGET_MB * 1024 * 1024)
+    )
+
+
+photo_uploader = PhotoUploader(create_photo_storage(), concurrency=config.PHOTO_UPLOAD_CONCURRENCY)
+
+
+async def close_photo_storage():
+    await photo_uploader.close()
@@ -0,0 +1,123 @@
+import asyncio
+import datetime
+import logging
+import time
+
+from collections import OrderedDict
+
+
+class DiaryPrefetcher:
+    def __init__(self, fetch, ttl=60, max_users=10000, radius=1):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_users = max_users
+        self.radius = radius
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self.wasted = 0
+        self.cancelled = 0
+        self._entries = OrderedDict()
+        self._tasks = {}
+
+    def _user_entries(self, telegram_id):
+        entries = self._entries.get(telegram_id)
+        if entries is None:
+            entries = self._entries[telegram_id] = {}
+        self._entries.move_to_end(telegram_id)
+
+        while len(self._entries) > self.max_users:
+            _, evicted = self._entries.popitem(last=False)
+            self.wasted += len(evicted)
+        return entries
+
+    def _take(self, telegram_id, day):
+        entries = self._entries.get(telegram_id)
+        if not entries or day not in entries:
+            return None
+
+        expires_at, context = entries.pop(day)
+        if expires_at < time.monotonic():
+            self.wasted += 1
+            return None
+        return context
+
+    async def get(self, telegram_id, day):
+        context = self._take(telegram_id, day)
+        if context is None:
+            task = self._tasks.get(telegram_id, {}).get(day)
+            if task is not None and not task.done():
+                await asyncio.wait([task])
+                context = self._take(telegram_id, day)
+
+        if context is not None:
+            self.hits += 1
+            return context
+
+        self.misses += 1
+        return await self.fetch(telegram_id, day)
+
+    def prefetch(self, telegram_id, center, today=None):
+        today = today or datetime.date.today()
+        wanted = {
+            center + datetime.timedelta(days=offset)
+            for offset in range(-self.radius, self.radius + 1)
+            if offset
+        }
+        wanted = {day for day in wanted if day <= today}
+
+        tasks = self._tasks.setdefault(telegram_id, {})
+        for day, task in list(tasks.items()):
+            if day not in wanted:
+                del tasks[day]
+                task.cancel()
+                self.cancelled += 1
+
+        entries = self._user_entries(telegram_id)
+        for day in list(entries):
+            if day not in wanted:
+                del entries[day]
+                self.wasted += 1
+
+        for day in wanted:
+            if day in entries or day in tasks:
+                continue
+
+            task = asyncio.create_task(self._prefetch(telegram_id, day))
+            tasks[day] = task
+            task.add_done_callback(lambda done, day=day: self._forget(telegram_id, day, done))
+
+    def _forget(self, telegram_id, day, task):
+        tasks = self._tasks.get(telegram_id)
+        if tasks is not None and tasks.get(day) is task:
+            del tasks[day]
+            if not tasks:
+                del self._tasks[telegram_id]
+
+    async def _prefetch(self, telegram_id, day):
+        try:
+            context = await self.fetch(telegram_id, day)
+        except Exception as e:
+            logging.warning(f"Diary prefetch for {telegram_id} {day} failed: {e}")
+            return
+
+        if context is not None:
+            self._user_entries(telegram_id)[day] = (time.monotonic() + self.ttl, context)
+            self.prefetched += 1
+
+    def invalidate(self, telegram_id):
+        for task in self._tasks.pop(telegram_id, {}).values():
+            task.cancel()
+        self._entries.pop(telegram_id, None)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "prefetched": self.prefetched,
+            "wasted": self.wasted,
+            "cancelled": self.cancelled,
+            "in_flight": sum(len(tasks) for tasks in self._tasks.values()),
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
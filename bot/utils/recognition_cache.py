@@ -0,0 +1,240 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+
+from data import config
+
+HASH_MASK = (1 << 64) - 1
+
+
+def _to_signed(value):
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _hamming(a, b):
+    if a is None or b is None:
+        return 64
+    return ((a ^ b) & HASH_MASK).bit_count()
+
+
+def _bands(phash, count):
+    """Split a 64-bit hash into `count` contiguous bands as (band, value) pairs.
+
+    Two hashes within distance `count - 1` differ in at most `count - 1` bands,
+    so they share at least one band exactly; only those rows need comparing.
+    """
+    phash &= HASH_MASK
+    width, extra = divmod(64, count)
+    shift = 0
+    for band in range(count):
+        bits = width + (band < extra)
+        yield band, _to_signed((phash >> shift) & ((1 << bits) - 1))
+        shift += bits
+
+
+class RecognitionCache:
+    def __init__(self, path, max_entries=50000, max_distance=6):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.band_count = min(64, max_distance + 1)
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._size = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS recognitions ("
+                "file_unique_id TEXT NOT NULL, "
+                "language TEXT NOT NULL, "
+                "phash INTEGER, "
+                "result TEXT NOT NULL, "
+                "photo TEXT, "
+                "last_used REAL NOT NULL, "
+                "PRIMARY KEY (file_unique_id, language))"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(recognitions)")}
+            if "photo" not in columns:
+                conn.execute("ALTER TABLE recognitions ADD COLUMN photo TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS recognitions_last_used ON recognitions (last_used)")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS recognition_bands ("
+                "language TEXT NOT NULL, "
+                "band INTEGER NOT NULL, "
+                "value INTEGER NOT NULL, "
+                "file_unique_id TEXT NOT NULL, "
+                "FOREIGN KEY (file_unique_id, language) REFERENCES recognitions (file_unique_id, language) "
+                "ON DELETE CASCADE)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS recognition_bands_lookup ON recognition_bands (language, band, value)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS recognition_bands_entry ON recognition_bands (file_unique_id, language)"
+            )
+            # The band layout depends on max_distance; rebuild it when that changes.
+            if conn.execute("PRAGMA user_version").fetchone()[0] != self.band_count:
+                self._rebuild_bands(conn)
+            conn.create_function("hamming", 2, _hamming, deterministic=True)
+            self._size = conn.execute("SELECT COUNT(*) FROM recognitions").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def _rebuild_bands(self, conn):
+        conn.execute("DELETE FROM recognition_bands")
+        rows = conn.execute("SELECT file_unique_id, language, phash FROM recognitions WHERE phash IS NOT NULL")
+        conn.executemany(
+            "INSERT INTO recognition_bands (language, band, value, file_unique_id) VALUES (?, ?, ?, ?)",
+            [
+                (language, band, value, file_unique_id)
+                for file_unique_id, language, phash in rows.fetchall()
+                for band, value in _bands(phash, self.band_count)
+            ]
+        )
+        conn.execute(f"PRAGMA user_version = {self.band_count}")
+        conn.commit()
+
+    def _touch(self, conn, file_unique_id, language):
+        conn.execute(
+            "UPDATE recognitions SET last_used = ? WHERE file_unique_id = ? AND language = ?",
+            (time.time(), file_unique_id, language)
+        )
+        conn.commit()
+
+    def _get(self, file_unique_id, language):
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT result, photo FROM recognitions WHERE file_unique_id = ? AND language = ?",
+                (file_unique_id, language)
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._touch(conn, file_unique_id, language)
+            return json.loads(row[0]), row[1]
+
+    def _get_similar(self, phash, language, file_unique_id, photo):
+        with self._lock:
+            conn = self._connect()
+            # Only entries sharing a band with the hash can be within max_distance.
+            bands = list(_bands(phash, self.band_count))
+            candidates = " UNION ALL ".join(
+                ["SELECT file_unique_id FROM recognition_bands WHERE language = ? AND band = ? AND value = ?"]
+                * len(bands)
+            )
+            row = conn.execute(
+                "SELECT file_unique_id, result, photo, hamming(phash, ?) AS distance FROM recognitions "
+                f"WHERE language = ? AND file_unique_id IN ({candidates}) AND distance <= ? "
+                "ORDER BY distance LIMIT 1",
+                (
+                    _to_signed(phash),
+                    language,
+                    *(item for band, value in bands for item in (language, band, value)),
+                    self.max_distance
+                )
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._touch(conn, row[0], language)
+            result, photo = json.loads(row[1]), photo or row[2]
+
+            # Remember this file too, so its next send is an exact hit.
+            if file_unique_id is not None:
+                self._insert(conn, file_unique_id, phash, language, row[1], photo)
+            return result, photo
+
+    def _insert(self, conn, file_unique_id, phash, language, result_json, photo):
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO recognitions (file_unique_id, language, phash, result, photo, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                file_unique_id,
+                language,
+                _to_signed(phash) if phash is not None else None,
+                result_json,
+                photo,
+                time.time()
+            )
+        )
+        self._size += cursor.rowcount
+
+        if cursor.rowcount and phash is not None:
+            conn.executemany(
+                "INSERT INTO recognition_bands (language, band, value, file_unique_id) VALUES (?, ?, ?, ?)",
+                [(language, band, value, file_unique_id) for band, value in _bands(phash, self.band_count)]
+            )
+
+        if self._size > self.max_entries:
+            evict = self._size - self.max_entries + self.max_entries // 10
+            conn.execute(
+                "DELETE FROM recognitions WHERE rowid IN "
+                "(SELECT rowid FROM recognitions ORDER BY last_used LIMIT ?)",
+                (evict,)
+            )
+            self._size = conn.execute("SELECT COUNT(*) FROM recognitions").fetchone()[0]
+        conn.commit()
+
+    def _set(self, file_unique_id, phash, language, result, photo):
+        with self._lock:
+            conn = self._connect()
+            self._insert(conn, file_unique_id, phash, language, json.dumps(result, ensure_ascii=False), photo)
+
+    async def get(self, file_unique_id, language):
+        result = await asyncio.to_thread(self._get, file_unique_id, language)
+        if result is not None:
+            self.exact_hits += 1
+        return result
+
+    async def get_similar(self, phash, language, file_unique_id=None, photo=None):
+        result = None
+        if phash is not None:
+            result = await asyncio.to_thread(self._get_similar, phash, language, file_unique_id, photo)
+
+        if result is not None:
+            self.similar_hits += 1
+        else:
+            self.misses += 1
+        return result
+
+    async def set(self, file_unique_id, phash, language, result, photo=None):
+        await asyncio.to_thread(self._set, file_unique_id, phash, language, result, photo)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self):
+        total = self.exact_hits + self.similar_hits + self.misses
+        hits = self.exact_hits + self.similar_hits
+        return {
+            "size": self._size,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0
+        }
+
+
+recognition_cache = RecognitionCache(
+    config.RECOGNITION_CACHE_PATH,
+    max_entries=config.RECOGNITION_CACHE_SIZE,
+    max_distance=config.RECOGNITION_CACHE_MAX_DISTANCE
+)
+
+
+async def close_recognition_cache():
+    recognition_cache.close()
@@ -0,0 +1,49 @@
+from types import MappingProxyType
+
+from utils.translation.localization import Localization
+from utils.ui import GOALS, LANGUAGE_BUTTONS
+
+
+MENU_BUTTONS = (
+    "add_meal_btn", "my_diary_btn", "settings_btn", "help_btn",
+    "change_goal", "change_weight", "change_language", "toggle_reminder", "back_to_menu"
+)
+
+
+def _normalize(text):
+    return text.strip().lower()
+
+
+def build_routes():
+    routes = {}
+
+    for language, translations in Localization.translations.items():
+        for key in MENU_BUTTONS:
+            if key in translations:
+                routes[_normalize(translations[key])] = key
+
+        for goal in GOALS:
+            label = translations.get(f"goal_{goal}")
+            if label:
+                routes[_normalize(label)] = f"goal:{goal}"
+
+    for label, language in LANGUAGE_BUTTONS.items():
+        routes[_normalize(label)] = f"language:{language}"
+
+    return MappingProxyType(routes)
+
+
+BUTTON_ROUTES = build_routes()
+
+
+def resolve_button(text):
+    if not text:
+        return None
+    return BUTTON_ROUTES.get(_normalize(text))
+
+
+def resolve_argument(text, prefix):
+    action = resolve_button(text)
+    if action and action.startswith(f"{prefix}:"):
+        return action[len(prefix) + 1:]
+    return None
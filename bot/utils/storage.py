@@ -0,0 +1,232 @@
+import asyncio
+import copy
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from data import config
+
+
+class KeyValueStore:
+    async def get(self, key):
+        raise NotImplementedError
+
+    async def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    async def delete(self, key):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryStore(KeyValueStore):
+    def __init__(self, ttl=3600, max_entries=100000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+
+    async def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.time():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key, value, ttl=None):
+        self._data[key] = (time.time() + (ttl or self.ttl), value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, key):
+        self._data.pop(key, None)
+
+
+class SQLiteStore(KeyValueStore):
+    def __init__(self, path, table, ttl=3600, max_entries=100000, flush_interval=0.05,
+                 batch_size=100, purge_interval=60):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.purge_interval = purge_interval
+        self._pending = OrderedDict()
+        self._conn = None
+        self._lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._flusher = None
+        self._purged_at = 0.0
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_expires_at ON {self.table} (expires_at)")
+            self._conn = conn
+        return self._conn
+
+    def _read(self, key):
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _write(self, batch, purge):
+        upserts = [(key, value, expires_at) for key, (value, expires_at) in batch if value is not None]
+        deletes = [(key,) for key, (value, _) in batch if value is None]
+
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                if upserts:
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                        upserts
+                    )
+                if deletes:
+                    conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", deletes)
+
+                if purge:
+                    conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+                    conn.execute(
+                        f"DELETE FROM {self.table} WHERE key IN ("
+                        f"SELECT key FROM {self.table} ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,)
+                    )
+
+    async def get(self, key):
+        key = str(key)
+        if key in self._pending:
+            value, expires_at = self._pending[key]
+            if value is None or expires_at < time.time():
+                return None
+            return json.loads(value)
+
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key, value, ttl=None):
+        await self._queue(key, json.dumps(value, ensure_ascii=False), time.time() + (ttl or self.ttl))
+
+    async def delete(self, key):
+        await self._queue(key, None, 0)
+
+    async def _queue(self, key, value, expires_at):
+        key = str(key)
+        self._pending[key] = (value, expires_at)
+        self._pending.move_to_end(key)
+
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+        elif self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            batch = list(self._pending.items())
+            now = time.time()
+            purge = now - self._purged_at >= self.purge_interval
+            if purge:
+                self._purged_at = now
+
+            try:
+                await asyncio.to_thread(self._write, batch, purge)
+            except sqlite3.Error as e:
+                logging.error(f"Storage flush to {self.table} failed: {e}")
+                return
+
+            for key, item in batch:
+                if self._pending.get(key) is item:
+                    del self._pending[key]
+
+    async def close(self):
+        if self._flusher is not None and not self._flusher.done():
+            self._flusher.cancel()
+        await self.flush()
+
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_store(namespace, ttl):
+    if config.STORAGE_BACKEND == "sqlite":
+        return SQLiteStore(
+            config.STORAGE_PATH,
+            table=namespace,
+            ttl=ttl,
+            max_entries=config.STORAGE_MAX_ENTRIES,
+            flush_interval=config.STORAGE_FLUSH_INTERVAL,
+            batch_size=config.STORAGE_BATCH_SIZE
+        )
+    return MemoryStore(ttl=ttl, max_entries=config.STORAGE_MAX_ENTRIES)
+
+
+class KeyValueFSMStorage(BaseStorage):
+    def __init__(self, store: KeyValueStore):
+        self.store = store
+
+    @staticmethod
+    def _key(key: StorageKey, part):
+        return ":".join(
+            str(value) for value in (
+                key.bot_id, key.chat_id, key.user_id, key.thread_id,
+                key.business_connection_id, key.destiny, part
+            )
+        )
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        if value is None:
+            await self.store.delete(self._key(key, "state"))
+        else:
+            await self.store.set(self._key(key, "state"), value)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self.store.get(self._key(key, "state"))
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not data:
+            await self.store.delete(self._key(key, "data"))
+        else:
+            await self.store.set(self._key(key, "data"), dict(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        data = await self.store.get(self._key(key, "data"))
+        return copy.deepcopy(data) if data else {}
+
+    async def close(self) -> None:
+        await self.store.close()
@@ -3,7 +3,8 @@ class Localization:
     translations = {
         'none': {
             "welcome": "Assalomu alaykum! Xush kelibsiz. Iltimos, tilni tanlang. 🇺🇿\n\nЗдравствуйте! Добро пожаловать. Пожалуйста, выберите язык. 🇷🇺\n\nHello! Welcome. Please select a language. 🇺🇸",
-            "error": "Nimadir notog'ri ketdi. 🇺🇿\n\nЧто-то пошло не так. 🇷🇺\n\nSomething went wrong. 🇺🇸"
+            "error": "Nimadir notog'ri ketdi. 🇺🇿\n\nЧто-то пошло не так. 🇷🇺\n\nSomething went wrong. 🇺🇸",
+            "too_many_requests": "⏳ Oldingi so'rovingiz hali bajarilmoqda, biroz kuting. 🇺🇿\n\n⏳ Предыдущий запрос ещё обрабатывается, подождите немного. 🇷🇺\n\n⏳ Your previous request is still being processed, please wait a moment. 🇺🇸"
         },
         'ru': {
             "add_meal_btn": "📸 Добавить еду",
@@ -48,7 +49,12 @@ class Localization:
             "type_new_param": "Введите новое значение:",
             "invalid_number": "Введите корректное положительное число.",
             "param_updated": "✅ Значение обновлено.",
-            "new_gram": "Введите новый грамм еды:"
+            "new_gram": "Введите новый грамм еды:",
+            "goal_maintain": "Поддержание веса",
+            "goal_gain": "Набор массы",
+            "goal_lose": "Похудение",
+            "report_logged_days": "Дней с записями",
+            "report_average": "В среднем за день"
         },
         "en": {
             "add_meal_btn": "📸 Add meal",
@@ -93,7 +99,12 @@ class Localization:
             "type_new_param": "Type new parametr:",
             "invalid_number": "Please enter a valid positive number.",
             "param_updated": "✅ Value updated.",
-            "new_gram": "Type new gram of food:"
+            "new_gram": "Type new gram of food:",
+            "goal_maintain": "Maintain weight",
+            "goal_gain": "Gain weight",
+            "goal_lose": "Lose weight",
+            "report_logged_days": "Days logged",
+            "report_average": "Daily average"
         },
         "uz": {
             "add_meal_btn": "📸 Ovqat qoshish",
@@ -138,7 +149,12 @@ class Localization:
             "type_new_param": "Yangi qiymat kiriting:",
             "invalid_number": "Iltimos, to‘g‘ri musbat son kiriting.",
             "param_updated": "✅ Qiymat yangilandi.",
-            "new_gram": "Ovqat uchun yangi gramni yozing:"
+            "new_gram": "Ovqat uchun yangi gramni yozing:",
+            "goal_maintain": "Vaznni saqlash",
+            "goal_gain": "Vazn yig'ish",
+            "goal_lose": "Ozish",
+            "report_logged_days": "Yozuvli kunlar",
+            "report_average": "Kunlik o‘rtacha"
         }
     }
 
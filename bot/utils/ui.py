@@ -0,0 +1,193 @@
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
+
+from aiogram import types
+
+from utils.translation.localization import Localization
+
+
+DEFAULT_LANGUAGE = "ru"
+
+GOALS = ("maintain", "gain", "lose")
+
+LANGUAGE_BUTTONS = MappingProxyType({
+    "uz🇺🇿": "uz",
+    "ru🇷🇺": "ru",
+    "eng🇺🇸": "en"
+})
+
+
+@dataclass(frozen=True)
+class UIBundle:
+    language: str
+    main_menu: types.ReplyKeyboardMarkup
+    settings_menu: types.ReplyKeyboardMarkup
+    calorie_goal: types.ReplyKeyboardMarkup
+    change_language: types.ReplyKeyboardMarkup
+    meal_actions: types.InlineKeyboardMarkup
+    goal_labels: Mapping[str, str]
+    meal_card: str
+    diary_card: str
+    summary_card: str
+    settings_card: str
+    range_card: str
+
+    def render_meal_card(self, meal):
+        return self.meal_card.format(
+            food_name=str(meal["food_name"]).title(),
+            grams=meal.get("grams", 100),
+            calories=meal["calories"],
+            protein=meal["protein"],
+            fat=meal["fat"],
+            carbs=meal["carbs"]
+        )
+
+    def render_diary_card(self, date, diary):
+        return self.diary_card.format(
+            date=date.strftime("%d.%m.%Y"),
+            calories=diary.get("total_calories", 0),
+            protein=diary.get("total_protein", 0),
+            fat=diary.get("total_fat", 0),
+            carbs=diary.get("total_carbs", 0)
+        )
+
+    def render_summary_card(self, diary):
+        return self.summary_card.format(
+            calories=diary.get("total_calories", 0),
+            protein=diary.get("total_protein", 0),
+            fat=diary.get("total_fat", 0),
+            carbs=diary.get("total_carbs", 0)
+        )
+
+    def render_range_card(self, report, days):
+        averages = report["averages"]
+
+        return self.range_card.format(
+            start=_format_date(report["start"]),
+            end=_format_date(report["end"]),
+            logged=report["logged_days"],
+            days=days,
+            calories=averages["total_calories"],
+            protein=averages["total_protein"],
+            fat=averages["total_fat"],
+            carbs=averages["total_carbs"],
+            lines="\n".join(
+                f"{_format_date(day['date'])}: {day['total_calories']} kkal" for day in report["days"]
+            )
+        )
+
+    def render_settings_card(self, settings):
+        weight = settings.get("weight_kg")
+
+        return self.settings_card.format(
+            goal=self.goal_labels.get(settings.get("goal"), "-"),
+            weight=f"{weight} kg" if weight else "-",
+            language=self.language.upper(),
+            reminder="✅ ON" if settings.get("morning_summary_enabled") else "❌ OFF"
+        )
+
+
+def _format_date(value):
+    return f"{value[8:10]}.{value[5:7]}.{value[:4]}"
+
+
+def _text(language, key):
+    return Localization.get_translation(language, key)
+
+
+def _template_text(language, key):
+    return _text(language, key).replace("{", "{{").replace("}", "}}")
+
+
+def _reply_keyboard(rows, **kwargs):
+    return types.ReplyKeyboardMarkup(
+        keyboard=[[types.KeyboardButton(text=text) for text in row] for row in rows],
+        resize_keyboard=True,
+        **kwargs
+    )
+
+
+def build_bundle(language):
+    t = lambda key: _text(language, key)
+    tt = lambda key: _template_text(language, key)
+
+    nutrients = (
+        f"🔥 {tt('calorie')}: {{calories}} kkal\n"
+        f"🍗 {tt('protein')}: {{protein}} g\n"
+        f"🥑 {tt('fat')}: {{fat}} g\n"
+        f"🍞 {tt('carbs')}: {{carbs}} g"
+    )
+    bold_nutrients = (
+        f"🔥 {tt('calorie')}: <b>{{calories}} kkal</b>\n"
+        f"🍗 {tt('protein')}: <b>{{protein}} g</b>\n"
+        f"🥑 {tt('fat')}: <b>{{fat}} g</b>\n"
+        f"🍞 {tt('carbs')}: <b>{{carbs}} g</b>"
+    )
+
+    goal_labels = MappingProxyType({goal: t(f"goal_{goal}") for goal in GOALS})
+
+    return UIBundle(
+        language=language,
+        main_menu=_reply_keyboard(
+            [[t("add_meal_btn"), t("my_diary_btn")], [t("settings_btn"), t("help_btn")]],
+            input_field_placeholder="Choose"
+        ),
+        settings_menu=_reply_keyboard(
+            [[t("change_goal"), t("change_weight")], [t("change_language"), t("toggle_reminder")], [t("back_to_menu")]],
+            one_time_keyboard=True
+        ),
+        calorie_goal=_reply_keyboard(
+            [[goal_labels[goal]] for goal in GOALS],
+            one_time_keyboard=True
+        ),
+        change_language=_reply_keyboard(
+            [list(LANGUAGE_BUTTONS)],
+            one_time_keyboard=True
+        ),
+        meal_actions=types.InlineKeyboardMarkup(inline_keyboard=[
+            [types.InlineKeyboardButton(text=t("save_button"), callback_data="save_meal")],
+            [types.InlineKeyboardButton(text=t("edit_grams_button"), callback_data="edit_grams")],
+            [types.InlineKeyboardButton(text=t("cancel_button"), callback_data="cancel_meal")]
+        ]),
+        goal_labels=goal_labels,
+        meal_card=(
+            "🍽️ <b>{food_name}: {grams} g</b>\n"
+            f"{nutrients}\n\n"
+            f"<i>{tt('confirm_meal_prompt')}</i>"
+        ),
+        diary_card=(
+            "<b>📔 {date}</b>\n\n"
+            f"{bold_nutrients}"
+        ),
+        summary_card=(
+            f"<b>{tt('summary_text')}</b>\n\n"
+            f"{bold_nutrients}"
+        ),
+        settings_card=(
+            f"{tt('settings_menu')}\n\n"
+            f"{tt('change_goal')}: {{goal}}\n"
+            f"{tt('change_weight')}: {{weight}}\n"
+            f"{tt('change_language')}: {{language}}\n"
+            f"{tt('toggle_reminder')}: {{reminder}}\n\n"
+            f"{tt('choose_button')}"
+        ),
+        range_card=(
+            "<b>📊 {start} — {end}</b>\n"
+            f"{tt('report_logged_days')}: {{logged}}/{{days}}\n\n"
+            f"<i>{tt('report_average')}</i>\n"
+            f"{bold_nutrients}\n\n"
+            "{lines}"
+        )
+    )
+
+
+UI_BUNDLES = MappingProxyType({
+    language: build_bundle(language)
+    for language in Localization.translations
+    if language != "none"
+})
+
+
+def get_ui(language) -> UIBundle:
+    return UI_BUNDLES.get(language) or UI_BUNDLES[DEFAULT_LANGUAGE]
@@ -1,19 +1,64 @@
+import asyncio
+import httpx
+import logging
 import openai
-import base64
 import json
-from pathlib import Path
+import random
 from data import config
 
-openai.api_key = config.GPT_TOKEN
+RETRYABLE_GPT_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError
+)
+
+_gpt_client = None
+_gpt_semaphore = asyncio.Semaphore(config.GPT_CONCURRENCY)
+
+
+def get_gpt_client():
+    global _gpt_client
+    if _gpt_client is None:
+        _gpt_client = openai.AsyncOpenAI(
+            api_key=config.GPT_TOKEN,
+            base_url=config.GPT_BASE_URL,
+            timeout=httpx.Timeout(config.GPT_TIMEOUT, connect=config.GPT_CONNECT_TIMEOUT),
+            max_retries=0,
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=config.GPT_CONCURRENCY,
+                    max_keepalive_connections=config.GPT_CONCURRENCY
+                )
+            )
+        )
+    return _gpt_client
+
+
+async def close_gpt_client():
+    global _gpt_client
+    if _gpt_client is not None:
+        await _gpt_client.close()
+        _gpt_client = None
+
 
+async def create_chat_completion(**kwargs):
+    client = get_gpt_client()
 
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
+    for attempt in range(config.GPT_MAX_RETRIES + 1):
+        try:
+            async with _gpt_semaphore:
+                return await client.chat.completions.create(**kwargs)
+        except RETRYABLE_GPT_ERRORS as e:
+            if attempt == config.GPT_MAX_RETRIES:
+                raise
 
+            backoff = min(config.GPT_RETRY_MAX_DELAY, config.GPT_RETRY_BASE_DELAY * 2 ** attempt)
+            delay = random.uniform(0, backoff)
+            logging.warning(f"GPT request failed ({e.__class__.__name__}), retry {attempt + 1} in {delay:.2f}s")
+            await asyncio.sleep(delay)
 
-async def analyze_image_with_gpt(language, photo_path):
-    PROMPT_TEMPLATES = {
+
+PROMPT_TEMPLATES = {
     "ru": """
 Ты — профессиональный нутрициолог и эксперт по визуальной оценке продуктов. По фотографии ты должен определить, что на ней изображено: блюдо, напиток, десерт или перекус.
 
@@ -91,21 +136,22 @@ Agar ovqatni aniqlab bo‘lmasa, javob shunday bo‘lsin:
 """
 }
 
-    def clean_json_block(text: str) -> str:
-        if text.startswith("```") and text.endswith("```"):
-            return "\n".join(text.strip().split("\n")[1:-1]).strip()
-        return text.strip()
 
+def clean_json_block(text: str) -> str:
+    if text.startswith("```") and text.endswith("```"):
+        return "\n".join(text.strip().split("\n")[1:-1]).strip()
+    return text.strip()
+
+
+async def analyze_image_with_gpt(language, base64_image):
     if language not in PROMPT_TEMPLATES:
         language = "ru"
 
-    if not Path(photo_path).exists():
-        return { "error": f"Файл {photo_path} не найден." }
+    if not base64_image:
+        return { "error": "Пустое изображение." }
 
     try:
-        base64_image = encode_image(photo_path)
-
-        response = openai.chat.completions.create(
+        response = await create_chat_completion(
             model="gpt-4o",
             messages=[
                 {
@@ -0,0 +1,120 @@
+import asyncio
+import hmac
+import logging
+
+from aiohttp import web
+
+from data import config
+from loader import bot, dp
+
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    def __init__(self, feed_update, secret_token, max_in_flight=100):
+        if not secret_token:
+            raise ValueError("Webhook server needs a secret token")
+
+        self.feed_update = feed_update
+        self.secret_token = secret_token
+        self.max_in_flight = max_in_flight
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.shed = 0
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tasks = set()
+
+    def create_app(self, path):
+        app = web.Application()
+        app.router.add_post(path, self.handle_update)
+        app.router.add_get("/health", self.health)
+        return app
+
+    async def handle_update(self, request):
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret_token):
+            self.rejected += 1
+            return web.Response(status=401)
+
+        try:
+            payload = await request.json()
+        except ValueError:
+            self.rejected += 1
+            return web.Response(status=400)
+
+        self.received += 1
+        # Never hold the response open: when every slot is busy Telegram is told to
+        # retry later instead of timing out and resending the update.
+        if self._slots.locked():
+            self.shed += 1
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        await self._slots.acquire()
+
+        task = asyncio.create_task(self._process(payload))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        return web.Response()
+
+    async def _process(self, payload):
+        try:
+            await self.feed_update(payload)
+        except Exception:
+            self.failed += 1
+            logging.exception("Webhook update failed")
+        finally:
+            self.processed += 1
+            self._slots.release()
+
+    async def health(self, request):
+        return web.json_response({
+            "status": "ok",
+            "in_flight": len(self._tasks),
+            "max_in_flight": self.max_in_flight,
+            "received": self.received,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "shed": self.shed
+        })
+
+    async def drain(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+async def feed_dispatcher(payload):
+    await dp.feed_raw_update(bot, payload)
+
+
+async def run_webhook(feed_update=feed_dispatcher):
+    server = WebhookServer(
+        feed_update,
+        secret_token=config.WEBHOOK_SECRET,
+        max_in_flight=config.WEBHOOK_MAX_IN_FLIGHT
+    )
+    runner = web.AppRunner(server.create_app(config.WEBHOOK_PATH))
+
+    await dp.emit_startup(bot=bot, bots=[bot], dispatcher=dp)
+
+    if config.WEBHOOK_URL:
+        await bot.set_webhook(
+            url=f"{config.WEBHOOK_URL.rstrip('/')}{config.WEBHOOK_PATH}",
+            secret_token=config.WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=config.WEBHOOK_MAX_CONNECTIONS
+        )
+
+    await runner.setup()
+    await web.TCPSite(runner, config.WEBHOOK_HOST, config.WEBHOOK_PORT).start()
+    logging.info(f"Webhook listening on {config.WEBHOOK_HOST}:{config.WEBHOOK_PORT}{config.WEBHOOK_PATH}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await server.drain()
+        await dp.emit_shutdown(bot=bot, bots=[bot], dispatcher=dp)
+        await bot.session.close()
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+
+from aiogram.methods import DeleteWebhook
+
+from data import config
+from loader import bot, dp
+from webhook import run_webhook
+
+
+EVENT_KEYS = (
+    "message", "edited_message", "callback_query", "inline_query", "chosen_inline_result",
+    "shipping_query", "pre_checkout_query", "poll_answer", "my_chat_member", "chat_member",
+    "chat_join_request", "business_message", "edited_business_message", "message_reaction"
+)
+
+PROCESSED, FAILED, IN_FLIGHT, BUSY_SECONDS = range(4)
+
+
+def extract_user_id(payload):
+    for key in EVENT_KEYS:
+        event = payload.get(key)
+        if not event:
+            continue
+
+        user = event.get("from") or event.get("user")
+        if user:
+            return user["id"]
+
+        chat = event.get("chat")
+        if chat:
+            return chat["id"]
+
+    return payload.get("update_id", 0)
+
+
+def _increment(stats, field, value=1):
+    with stats.get_lock():
+        stats[field] += value
+
+
+async def _handle(payload, stats, slots):
+    _increment(stats, IN_FLIGHT)
+    started_at = time.monotonic()
+
+    try:
+        await dp.feed_raw_update(bot, payload)
+    except Exception:
+        _increment(stats, FAILED)
+        logging.exception("Worker failed to process update")
+    finally:
+        slots.release()
+        with stats.get_lock():
+            stats[IN_FLIGHT] -= 1
+            stats[PROCESSED] += 1
+            stats[BUSY_SECONDS] += time.monotonic() - started_at
+
+
+async def _run_worker(updates, stats):
+    loop = asyncio.get_running_loop()
+    tasks = set()
+    # Updates stay in the bounded queue until a slot frees up, so a burst
+    # fills the queue and blocks the supervisor instead of piling up here.
+    slots = asyncio.Semaphore(config.WORKER_MAX_IN_FLIGHT)
+
+    await dp.emit_startup(bot=bot, bots=[bot], dispatcher=dp)
+
+    try:
+        while True:
+            await slots.acquire()
+            payload = await loop.run_in_executor(None, updates.get)
+            if payload is None:
+                break
+
+            task = asyncio.create_task(_handle(payload, stats, slots))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await dp.emit_shutdown(bot=bot, bots=[bot], dispatcher=dp)
+        await bot.session.close()
+
+
+def worker_main(index, updates, stats):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    logging.info(f"Worker {index} started")
+    asyncio.run(_run_worker(updates, stats))
+    logging.info(f"Worker {index} stopped")
+
+
+class Supervisor:
+    def __init__(self, workers):
+        context = multiprocessing.get_context("fork")
+
+        self.queues = [context.Queue(maxsize=config.WORKER_QUEUE_SIZE) for _ in range(workers)]
+        self.stats = [context.Array("d", 4) for _ in range(workers)]
+        self.routed = [0] * workers
+        self.processes = [
+            context.Process(
+                target=worker_main,
+                args=(index, self.queues[index], self.stats[index]),
+                name=f"bot-worker-{index}"
+            )
+            for index in range(workers)
+        ]
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+
+    async def dispatch(self, payload):
+        index = extract_user_id(payload) % len(self.queues)
+
+        try:
+            self.queues[index].put_nowait(payload)
+        except queue.Full:
+            await asyncio.to_thread(self.queues[index].put, payload)
+
+        self.routed[index] += 1
+
+    async def drain(self):
+        for updates in self.queues:
+            await asyncio.to_thread(updates.put, None)
+
+        for process in self.processes:
+            await asyncio.to_thread(process.join, config.WORKER_DRAIN_TIMEOUT)
+            if process.is_alive():
+                logging.warning(f"{process.name} did not drain in time, killing it")
+                process.kill()
+                await asyncio.to_thread(process.join)
+
+    def load_report(self):
+        report = []
+        for index, stats in enumerate(self.stats):
+            with stats.get_lock():
+                processed, failed, in_flight, busy_seconds = stats[:]
+
+            report.append({
+                "worker": index,
+                "alive": self.processes[index].is_alive(),
+                "routed": self.routed[index],
+                "queued": max(0, self.routed[index] - int(processed) - int(in_flight)),
+                "in_flight": int(in_flight),
+                "processed": int(processed),
+                "failed": int(failed),
+                "avg_ms": round(busy_seconds / processed * 1000, 1) if processed else 0.0
+            })
+        return report
+
+    def log_load(self):
+        for row in self.load_report():
+            logging.info(
+                f"Worker {row['worker']}: routed={row['routed']} queued={row['queued']} "
+                f"in_flight={row['in_flight']} processed={row['processed']} "
+                f"failed={row['failed']} avg={row['avg_ms']}ms alive={row['alive']}"
+            )
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(config.WORKER_STATS_INTERVAL)
+            self.log_load()
+
+    async def _poll(self):
+        await bot(DeleteWebhook(drop_pending_updates=True))
+
+        offset = None
+        allowed_updates = dp.resolve_used_update_types()
+
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=offset, timeout=config.POLLING_TIMEOUT, allowed_updates=allowed_updates
+                )
+            except Exception as e:
+                logging.warning(f"Polling failed: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for update in updates:
+                offset = update.update_id + 1
+                await self.dispatch(update.model_dump(mode="json", by_alias=True, exclude_none=True))
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        if config.BOT_MODE == "webhook":
+            ingest = asyncio.create_task(run_webhook(feed_update=self.dispatch))
+        else:
+            ingest = asyncio.create_task(self._poll())
+        reporter = asyncio.create_task(self._report_loop())
+        stopped = asyncio.create_task(stop.wait())
+
+        await asyncio.wait([ingest, stopped], return_when=asyncio.FIRST_COMPLETED)
+
+        for task in (ingest, reporter, stopped):
+            task.cancel()
+        await asyncio.gather(ingest, reporter, stopped, return_exceptions=True)
+
+        logging.info("Draining workers")
+        await self.drain()
+        self.log_load()
+        await bot.session.close()
+
+
+    def terminate(self):
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join()
+
+
+def run_supervisor(workers):
+    # Workers are not daemonic so IMAGE_EXECUTOR=process can start its pool
+    # inside them, which means the supervisor has to stop them itself.
+    supervisor = Supervisor(workers)
+    supervisor.start()
+    try:
+        asyncio.run(supervisor.serve())
+    finally:
+        supervisor.terminate()
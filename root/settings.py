@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+import sys
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -83,10 +84,25 @@ WSGI_APPLICATION = 'root.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv("SQLITE_PATH") or BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+        },
+        # A file rather than shared-cache memory, so concurrent-write tests see
+        # the same busy-timeout locking as the real database.
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# Migrations for the user app are generated per deployment and are not tracked,
+# so test and load-test databases are built straight from the models.
+if "test" in sys.argv or os.getenv("SYNC_USER_MODELS", "False").lower() == "true":
+    MIGRATION_MODULES = {"user": None}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -130,3 +146,7 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 APPEND_SLASH = False
+
+STATS_CACHE_TIMEOUT = int(os.getenv("STATS_CACHE_TIMEOUT", 60))
+STATS_MAX_DAYS = int(os.getenv("STATS_MAX_DAYS", 90))
+DIARY_RANGE_MAX_DAYS = int(os.getenv("DIARY_RANGE_MAX_DAYS", 366))
@@ -0,0 +1,24 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5("|".join(map(str, parts)).encode()).hexdigest())
+
+
+def latest_timestamp(*moments):
+    moments = [moment for moment in moments if moment is not None]
+    return int(max(moments).timestamp()) if moments else None
+
+
+def not_modified(request, etag, last_modified=None):
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
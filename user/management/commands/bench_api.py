@@ -0,0 +1,376 @@
+import json
+import math
+import os
+import random
+import time
+import uuid
+
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Min, QuerySet
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from user.models import AppUser, Diary, Meal
+
+
+@dataclass
+class Sample:
+    user_id: int
+    telegram_id: int
+    diary_id: int
+    meal_id: int
+    day: object
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    path: Callable
+    body: Optional[Callable] = None
+    write: bool = False
+    setup: Optional[Callable] = None
+    # Unpaginated lists serialize the whole queryset; skipped above --max-list-rows.
+    lists: Optional[QuerySet] = None
+    status: tuple = (200,)
+
+
+def _day_path(day):
+    return f"{day.year}/{day.month}/{day.day}"
+
+
+def build_endpoints():
+    today = timezone.localdate()
+
+    return [
+        Endpoint("api-root", "get", lambda s, i: "/api/"),
+        Endpoint("users-list", "get", lambda s, i: "/api/users/", lists=AppUser.objects.all()),
+        Endpoint("users-detail", "get", lambda s, i: f"/api/users/{s.user_id}/"),
+        Endpoint("diary-list", "get", lambda s, i: "/api/diary/", lists=Diary.objects.all()),
+        Endpoint("diary-detail", "get", lambda s, i: f"/api/diary/{s.diary_id}/"),
+        Endpoint("meal-list", "get", lambda s, i: "/api/meal/", lists=Meal.objects.all()),
+        Endpoint("meal-detail", "get", lambda s, i: f"/api/meal/{s.meal_id}/"),
+        Endpoint("profile", "get", lambda s, i: f"/api/users/telegram/{s.telegram_id}"),
+        Endpoint(
+            "profile-update", "patch", lambda s, i: f"/api/users/telegram/{s.telegram_id}",
+            body=lambda s, i: {"weight_kg": f"{60 + i % 40}.50"}, write=True
+        ),
+        Endpoint("context", "get", lambda s, i: f"/api/users/telegram/{s.telegram_id}/context/{_day_path(s.day)}"),
+        Endpoint(
+            "log-meal", "post", lambda s, i: f"/api/users/telegram/{s.telegram_id}/meals/today",
+            body=lambda s, i: {
+                "food_name": "bench", "grams": 200, "calories": "360.00", "protein": "12.00",
+                "fat": "9.50", "carbs": "51.00", "idempotency_key": uuid.uuid4().hex
+            },
+            write=True, status=(200, 201)
+        ),
+        Endpoint(
+            "diary-range", "get",
+            lambda s, i: f"/api/users/telegram/{s.telegram_id}/diary/range/{today - timedelta(days=29)}/{today}"
+        ),
+        Endpoint("diary-by-date", "get", lambda s, i: f"/api/diary/date/{s.user_id}/{_day_path(s.day)}"),
+        Endpoint("stats", "get", lambda s, i: "/api/stats/", setup=cache.clear),
+        Endpoint(
+            "reminder-list", "get", lambda s, i: "/api/users/reminder",
+            lists=AppUser.objects.filter(morning_summary_enabled=True)
+        ),
+        Endpoint("summaries", "get", lambda s, i: f"/api/diary/summaries/{_day_path(s.day)}")
+    ]
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+
+class RowsScanned:
+    """Rows a query reads, as well as the backend can tell.
+
+    PostgreSQL reports actual rows per scan node via EXPLAIN ANALYZE. SQLite
+    only says whether a table is searched through an index or scanned, so a
+    full scan is counted as the table's size and index searches as zero; the
+    plan steps are kept so a switch to a worse index still shows up.
+    """
+
+    def __init__(self):
+        self.table_sizes = {}
+
+    def table_size(self, cursor, table):
+        if table not in self.table_sizes:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+            self.table_sizes[table] = cursor.fetchone()[0]
+        return self.table_sizes[table]
+
+    def explain(self, sql):
+        vendor = connection.vendor
+
+        with connection.cursor() as cursor:
+            if vendor == "postgresql":
+                cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")
+                plan = cursor.fetchone()[0]
+                plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+                rows, scans, steps = 0, [], []
+                for node in _plan_nodes(plan):
+                    if "Relation Name" in node:
+                        loops = node.get("Actual Loops", 1)
+                        rows += (node.get("Actual Rows", 0) + node.get("Rows Removed by Filter", 0)) * loops
+                        if node["Node Type"] == "Seq Scan":
+                            scans.append(node["Relation Name"])
+                        steps.append(" ".join(filter(None, (
+                            node["Node Type"], node["Relation Name"], node.get("Index Name")
+                        ))))
+                return rows, scans, steps
+
+            if vendor == "sqlite":
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                rows, scans, steps = 0, [], []
+                for *_, detail in cursor.fetchall():
+                    words = detail.split()
+                    if words[0] == "SCAN" and "INDEX" not in words:
+                        rows += self.table_size(cursor, words[1])
+                        scans.append(words[1])
+                    steps.append(detail)
+                return rows, scans, steps
+
+            cursor.execute(f"EXPLAIN {sql}")
+            columns = [column[0].lower() for column in cursor.description]
+            rows = sum(row[columns.index("rows")] or 0 for row in cursor.fetchall()) if "rows" in columns else 0
+            return rows, [], []
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every endpoint in user/urls.py against the current database, recording "
+        "latency, query count and rows scanned, and compare the run with a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="timed requests per endpoint")
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--samples", type=int, default=10, help="distinct users/diaries requests rotate over")
+        parser.add_argument("--only", action="append", default=[], help="endpoint name, can be repeated")
+        parser.add_argument("--max-list-rows", type=int, default=20000,
+                            help="skip unpaginated list endpoints over more rows than this")
+        parser.add_argument("--baseline", help="baseline JSON to compare with")
+        parser.add_argument("--save-baseline", help="write this run as a baseline JSON")
+        parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+        parser.add_argument("--fail-on-regression", action="store_true")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        endpoints = build_endpoints()
+        if options["only"]:
+            unknown = set(options["only"]) - {endpoint.name for endpoint in endpoints}
+            if unknown:
+                raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+            endpoints = [endpoint for endpoint in endpoints if endpoint.name in options["only"]]
+
+        # CustomPermission compares the Auth header with the token in the environment.
+        token = os.environ.setdefault("BOT_TOKEN", "bench-api")
+        self.client = Client(HTTP_AUTH=token)
+        self.options = options
+        self.rows_scanned = RowsScanned()
+
+        samples = self.pick_samples(random.Random(options["seed"]), options["samples"])
+
+        results = {}
+        for endpoint in endpoints:
+            results[endpoint.name] = self.run_endpoint(endpoint, samples)
+
+        run = {
+            "meta": {
+                "vendor": connection.vendor,
+                "created_at": timezone.now().isoformat(),
+                "repeat": options["repeat"],
+                "rows": {
+                    "users": AppUser.objects.count(),
+                    "diaries": Diary.objects.count(),
+                    "meals": Meal.objects.count()
+                }
+            },
+            "endpoints": results
+        }
+
+        baseline = None
+        if options["baseline"]:
+            try:
+                with open(options["baseline"]) as f:
+                    baseline = json.load(f)
+            except FileNotFoundError:
+                raise CommandError(f"Baseline {options['baseline']} not found, create it with --save-baseline")
+
+        regressions = self.report(run, baseline)
+
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w") as f:
+                json.dump(run, f, indent=2)
+            self.stdout.write(f"Baseline written to {options['save_baseline']}")
+
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"Regressions against baseline: {', '.join(regressions)}")
+
+    def pick_samples(self, rng, count):
+        bounds = Diary.objects.aggregate(low=Min("id"), high=Max("id"))
+        if bounds["low"] is None:
+            raise CommandError("No diaries to benchmark against, run seed_data first")
+
+        samples = {}
+        for _ in range(count * 4):
+            diary = Diary.objects.filter(
+                pk__gte=rng.randint(bounds["low"], bounds["high"]), meals__isnull=False
+            ).select_related("user").order_by("pk").first()
+            if diary is None or diary.pk in samples:
+                continue
+
+            samples[diary.pk] = Sample(
+                user_id=diary.user_id,
+                telegram_id=diary.user.telegram_id,
+                diary_id=diary.pk,
+                meal_id=diary.meals.order_by("pk").values_list("pk", flat=True).first(),
+                day=diary.date
+            )
+            if len(samples) == count:
+                break
+        return list(samples.values())
+
+    def request(self, endpoint, sample, index):
+        path = endpoint.path(sample, index)
+        if endpoint.setup:
+            endpoint.setup()
+
+        started_at = time.perf_counter()
+        if endpoint.body is None:
+            response = getattr(self.client, endpoint.method)(path)
+        else:
+            response = getattr(self.client, endpoint.method)(
+                path, json.dumps(endpoint.body(sample, index)), content_type="application/json"
+            )
+        elapsed = time.perf_counter() - started_at
+
+        if response.status_code not in endpoint.status:
+            raise CommandError(f"{endpoint.name}: {endpoint.method.upper()} {path} returned {response.status_code}")
+        return elapsed
+
+    def timed_request(self, endpoint, sample, index):
+        if not endpoint.write:
+            return self.request(endpoint, sample, index)
+
+        # Writes are rolled back so repeated runs see the same dataset.
+        with transaction.atomic():
+            elapsed = self.request(endpoint, sample, index)
+            transaction.set_rollback(True)
+        return elapsed
+
+    def run_endpoint(self, endpoint, samples):
+        if endpoint.lists is not None:
+            rows = endpoint.lists.count()
+            if rows > self.options["max_list_rows"]:
+                return {"skipped": f"unpaginated list over {rows} rows"}
+
+        warmup, repeat = self.options["warmup"], self.options["repeat"]
+        timings = []
+        for index in range(warmup + repeat):
+            elapsed = self.timed_request(endpoint, samples[index % len(samples)], index)
+            if index >= warmup:
+                timings.append(elapsed * 1000)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.timed_request(endpoint, samples[0], warmup + repeat)
+
+        statements = [query["sql"] for query in queries.captured_queries]
+        selects = [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+
+        rows, scans, plan = 0, [], []
+        for sql in selects:
+            query_rows, query_scans, query_plan = self.rows_scanned.explain(sql)
+            rows += query_rows
+            scans.extend(query_scans)
+            plan.extend(query_plan)
+
+        return {
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "mean_ms": round(sum(timings) / len(timings), 3),
+            "queries": sum(1 for sql in statements if not sql.upper().startswith(("SAVEPOINT", "RELEASE", "ROLLBACK"))),
+            "rows_scanned": rows,
+            "full_scans": sorted(set(scans)),
+            "plan": plan
+        }
+
+    def compare(self, current, previous):
+        tolerance = self.options["tolerance"]
+        problems = []
+
+        # Sub-millisecond jitter is noise, not a regression.
+        if current["p50_ms"] > previous["p50_ms"] * (1 + tolerance) and current["p50_ms"] - previous["p50_ms"] > 0.5:
+            problems.append(f"p50 {previous['p50_ms']:.2f}->{current['p50_ms']:.2f}ms")
+        if current["queries"] > previous["queries"]:
+            problems.append(f"queries {previous['queries']}->{current['queries']}")
+        if current["rows_scanned"] > previous["rows_scanned"] * (1 + tolerance):
+            problems.append(f"rows {previous['rows_scanned']}->{current['rows_scanned']}")
+        for table in sorted(set(current["full_scans"]) - set(previous["full_scans"])):
+            problems.append(f"new full scan of {table}")
+        return problems
+
+    def plan_changes(self, current, previous):
+        return [step for step in current.get("plan", []) if step not in previous.get("plan", [])]
+
+    def report(self, run, baseline):
+        rows = run["meta"]["rows"]
+        self.stdout.write(
+            f"{connection.vendor}: {rows['users']} users, {rows['diaries']} diaries, {rows['meals']} meals, "
+            f"{self.options['repeat']} requests per endpoint\n"
+        )
+        if baseline and baseline["meta"]["rows"] != rows:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was recorded on a different dataset: {baseline['meta']['rows']}\n"
+            ))
+
+        self.stdout.write(
+            f"{'endpoint':<16}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'queries':>9}{'rows scanned':>14}  full scans"
+        )
+
+        regressions = []
+        for name, result in run["endpoints"].items():
+            if "skipped" in result:
+                self.stdout.write(f"{name:<16}  skipped: {result['skipped']}")
+                continue
+
+            self.stdout.write(
+                f"{name:<16}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['mean_ms']:>10.2f}"
+                f"{result['queries']:>9}{result['rows_scanned']:>14}  {', '.join(result['full_scans']) or '-'}"
+            )
+
+            previous = (baseline or {}).get("endpoints", {}).get(name)
+            if not previous or "skipped" in previous:
+                continue
+
+            problems = self.compare(result, previous)
+            if problems:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(f"{'':<16}REGRESSION: {'; '.join(problems)}"))
+
+            for step in self.plan_changes(result, previous):
+                self.stdout.write(self.style.WARNING(f"{'':<16}plan changed: {step}"))
+
+        if baseline is not None:
+            if regressions:
+                self.stdout.write(self.style.ERROR(f"\n{len(regressions)} endpoints regressed"))
+            else:
+                self.stdout.write(self.style.SUCCESS("\nNo regressions against baseline"))
+
+        return regressions
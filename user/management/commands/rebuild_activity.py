@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from user.services import rebuild_activity_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild AppUser.last_active_at and DailyActivity rollups from the meal history"
+
+    def handle(self, *args, **options):
+        rebuild_activity_rollups()
+        self.stdout.write(self.style.SUCCESS("Activity rollups rebuilt"))
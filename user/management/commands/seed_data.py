@@ -0,0 +1,250 @@
+import random
+import time
+
+from collections import Counter
+from datetime import datetime, time as day_time, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from user.models import AppUser, DailyActivity, Diary, Gender, Goal, Language, Meal
+
+
+# name, kcal, protein, fat, carbs per 100 g
+FOODS = (
+    ("plov", 180, 5.6, 8.4, 21.0),
+    ("lagman", 130, 6.2, 4.1, 17.5),
+    ("samsa", 310, 9.8, 18.6, 27.0),
+    ("manti", 220, 10.5, 11.2, 19.4),
+    ("shashlik", 245, 21.0, 17.3, 1.2),
+    ("oatmeal", 88, 3.2, 1.8, 15.0),
+    ("chicken breast", 165, 31.0, 3.6, 0.0),
+    ("rice", 130, 2.7, 0.3, 28.0),
+    ("buckwheat", 110, 4.2, 1.1, 21.3),
+    ("borscht", 57, 2.9, 2.4, 6.3),
+    ("greek salad", 95, 2.8, 7.9, 3.9),
+    ("apple", 52, 0.3, 0.2, 13.8),
+    ("banana", 89, 1.1, 0.3, 22.8),
+    ("bread", 265, 9.0, 3.2, 49.0),
+    ("cottage cheese", 121, 17.0, 5.0, 3.0),
+    ("eggs", 155, 13.0, 11.0, 1.1),
+    ("pasta", 158, 5.8, 0.9, 30.9),
+    ("yogurt", 61, 3.5, 3.3, 4.7)
+)
+
+MEAL_HOURS = (8, 13, 19, 11, 16, 21)
+
+LANGUAGES = (Language.RU, Language.UZ, Language.EN)
+LANGUAGE_WEIGHTS = (6, 3, 1)
+
+USER_FIELDS = (
+    "telegram_id", "name", "gender", "age", "height_cm", "weight_kg", "goal", "language",
+    "morning_summary_enabled", "last_active_at", "created_at", "updated_at"
+)
+DIARY_FIELDS = (
+    "user", "date", "total_calories", "total_protein", "total_fat", "total_carbs", "created_at", "updated_at"
+)
+MEAL_FIELDS = (
+    "diary", "food_name", "grams", "calories", "protein", "fat", "carbs", "image_url", "created_at", "updated_at"
+)
+
+
+def _cents(value):
+    return Decimal(value).scaleb(-2)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users, diaries and meals for benchmarking. Rows are inserted with executemany and "
+        "pre-adapted values rather than bulk_create, which spends most of its time preparing fields. "
+        "Roughly users * days * activity * meals-per-day meals are created, "
+        "e.g. --users 1000000 --days 24 gives ~50M meals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--days", type=int, default=30, help="days of history ending today")
+        parser.add_argument("--meals-per-day", type=float, default=3.0, help="average meals on a logged day")
+        parser.add_argument("--activity", type=float, default=0.7, help="average share of days a user logs meals")
+        parser.add_argument("--chunk", type=int, default=1000, help="users generated per transaction")
+        parser.add_argument("--batch-size", type=int, default=5000, help="rows per INSERT statement")
+        parser.add_argument("--start-telegram-id", type=int, default=9_000_000_000)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        users = options["users"]
+        start_id = options["start_telegram_id"]
+        chunk = max(1, options["chunk"])
+
+        if users < 1 or options["days"] < 1:
+            raise CommandError("--users and --days must be positive")
+        if AppUser.objects.filter(telegram_id__range=(start_id, start_id + users - 1)).exists():
+            raise CommandError(
+                f"Telegram ids {start_id}..{start_id + users - 1} are already taken, pass another --start-telegram-id"
+            )
+
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        today = timezone.localdate()
+        self.days = [today - timedelta(days=offset) for offset in range(options["days"])]
+        self.midnights = {}
+        self.active_users = Counter()
+        self.meals_logged = Counter()
+
+        started_at = time.monotonic()
+        totals = Counter()
+
+        for offset in range(0, users, chunk):
+            first_id = start_id + offset
+            created = self.seed_chunk(first_id, min(chunk, users - offset))
+            totals.update(created)
+
+            if options["verbosity"] >= 1:
+                elapsed = time.monotonic() - started_at
+                self.stdout.write(
+                    f"users {totals['users']}/{users}, diaries {totals['diaries']}, "
+                    f"meals {totals['meals']} ({totals['meals'] / elapsed:.0f} meals/s)"
+                )
+
+        self.update_rollups()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {totals['users']} users, {totals['diaries']} diaries and {totals['meals']} meals "
+            f"in {time.monotonic() - started_at:.1f}s"
+        ))
+
+    def midnight(self, day):
+        midnight = self.midnights.get(day)
+        if midnight is None:
+            midnight = self.midnights[day] = timezone.make_aware(datetime.combine(day, day_time()))
+        return midnight
+
+    def make_user(self, telegram_id, last_active_at):
+        rng = self.rng
+        gender = rng.choice((Gender.MALE, Gender.FEMALE))
+        height = rng.randint(165, 195) if gender == Gender.MALE else rng.randint(150, 180)
+        joined = self.midnight(self.days[-1]) - timedelta(days=rng.randint(1, 365), hours=rng.randint(0, 23))
+
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+        joined = adapt_datetime(joined)
+
+        return (
+            telegram_id,
+            f"seed-{telegram_id}",
+            gender,
+            rng.randint(16, 70),
+            height,
+            _cents(rng.randint(4500, 13000)),
+            rng.choice(Goal.values),
+            rng.choices(LANGUAGES, LANGUAGE_WEIGHTS)[0],
+            rng.random() < 0.8,
+            adapt_datetime(last_active_at),
+            joined,
+            joined
+        )
+
+    def make_meals(self, day):
+        rng = self.rng
+        average = self.options["meals_per_day"]
+        count = max(1, round(rng.uniform(average / 2, average * 1.5)))
+        midnight = self.midnight(day)
+
+        meals = []
+        times = sorted(timedelta(hours=rng.choice(MEAL_HOURS), minutes=rng.randint(0, 59)) for _ in range(count))
+
+        for offset in times:
+            name, calories, protein, fat, carbs = rng.choice(FOODS)
+            grams = rng.randint(80, 450)
+            digest = f"{rng.getrandbits(256):064x}" if rng.random() < 0.6 else None
+
+            meals.append((
+                midnight + offset,
+                name,
+                grams,
+                _cents(round(calories * grams)),
+                _cents(round(protein * grams)),
+                _cents(round(fat * grams)),
+                _cents(round(carbs * grams)),
+                f"photos/{digest[:2]}/{digest}.jpg" if digest else None
+            ))
+        return meals
+
+    def insert_rows(self, model, fields, rows):
+        columns = [model._meta.get_field(name).column for name in fields]
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            connection.ops.quote_name(model._meta.db_table),
+            ", ".join(connection.ops.quote_name(column) for column in columns),
+            ", ".join(["%s"] * len(columns))
+        )
+
+        batch_size = self.options["batch_size"]
+        with connection.cursor() as cursor:
+            for offset in range(0, len(rows), batch_size):
+                cursor.executemany(sql, rows[offset:offset + batch_size])
+
+    @transaction.atomic
+    def seed_chunk(self, first_id, count):
+        rng = self.rng
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+        adapt_date = connection.ops.adapt_datefield_value
+
+        plans = {}
+        for telegram_id in range(first_id, first_id + count):
+            activity = min(1.0, rng.uniform(0, 2 * self.options["activity"]))
+            plans[telegram_id] = {day: self.make_meals(day) for day in self.days if rng.random() < activity}
+
+        users = [
+            self.make_user(telegram_id, max((meals[-1][0] for meals in plan.values()), default=None))
+            for telegram_id, plan in plans.items()
+        ]
+        self.insert_rows(AppUser, USER_FIELDS, users)
+        user_ids = dict(
+            AppUser.objects.filter(telegram_id__range=(first_id, first_id + count - 1)).values_list("telegram_id", "id")
+        )
+
+        diaries = []
+        for telegram_id, plan in plans.items():
+            for day, meals in plan.items():
+                diaries.append((
+                    user_ids[telegram_id],
+                    adapt_date(day),
+                    sum(meal[3] for meal in meals),
+                    sum(meal[4] for meal in meals),
+                    sum(meal[5] for meal in meals),
+                    sum(meal[6] for meal in meals),
+                    adapt_datetime(meals[0][0]),
+                    adapt_datetime(meals[-1][0])
+                ))
+                self.active_users[day] += 1
+                self.meals_logged[day] += len(meals)
+
+        self.insert_rows(Diary, DIARY_FIELDS, diaries)
+
+        telegram_ids = {user_id: telegram_id for telegram_id, user_id in user_ids.items()}
+        rows = []
+        for user_id, day, diary_id in Diary.objects.filter(user_id__in=telegram_ids).values_list(
+            "user_id", "date", "id"
+        ):
+            for created_at, *meal in plans[telegram_ids[user_id]][day]:
+                created_at = adapt_datetime(created_at)
+                rows.append((diary_id, *meal, created_at, created_at))
+
+        self.insert_rows(Meal, MEAL_FIELDS, rows)
+
+        return Counter(users=len(users), diaries=len(diaries), meals=len(rows))
+
+    @transaction.atomic
+    def update_rollups(self):
+        # Seeded users are new, so their activity adds to whatever is already rolled up.
+        for day in sorted(self.meals_logged):
+            updated = DailyActivity.objects.filter(date=day).update(
+                active_users=F("active_users") + self.active_users[day],
+                meals_logged=F("meals_logged") + self.meals_logged[day]
+            )
+            if not updated:
+                DailyActivity.objects.create(
+                    date=day, active_users=self.active_users[day], meals_logged=self.meals_logged[day]
+                )
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils import timezone
 
@@ -48,6 +48,7 @@ class AppUser(TimeStampedModel):
     carb_target_g = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
 
     morning_summary_enabled = models.BooleanField(default=True)
+    last_active_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
     def __str__(self):
         return f"{self.telegram_id} ({self.name or '-'})"
@@ -83,9 +84,28 @@ class Meal(TimeStampedModel):
 
     image_url = models.CharField(max_length=300, null=True, blank=True)
     ai_raw_json = models.CharField(max_length=400, null=True, blank=True)
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
 
     def __str__(self):
         return f"{self.food_name} ({self.grams} g)"
+
+    def save(self, *args, **kwargs):
+        # The diary totals signals lock the previous row and apply a delta;
+        # both must commit or roll back together with the meal itself.
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
+
+class DailyActivity(models.Model):
+    date = models.DateField(unique=True)
+    active_users = models.PositiveIntegerField(default=0)
+    meals_logged = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"DailyActivity({self.date}: {self.active_users} users, {self.meals_logged} meals)"
@@ -6,6 +6,7 @@ class AppUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = AppUser
         fields = "__all__"
+        read_only_fields = ("last_active_at",)
 
 
 class MealSerializer(serializers.ModelSerializer):
@@ -13,6 +14,16 @@ class MealSerializer(serializers.ModelSerializer):
         model = Meal
         fields = "__all__"
 
+
+class LogMealSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Meal
+        fields = (
+            "food_name", "grams", "calories", "protein", "fat", "carbs",
+            "image_url", "ai_raw_json", "idempotency_key"
+        )
+        extra_kwargs = {"idempotency_key": {"validators": []}}
+
     
 class DiarySerializer(serializers.ModelSerializer):
     meals = MealSerializer(many=True, read_only=True)
@@ -20,3 +31,40 @@ class DiarySerializer(serializers.ModelSerializer):
     class Meta:
         model = Diary
         fields = "__all__"
+
+
+class DiarySummarySerializer(serializers.ModelSerializer):
+    telegram_id = serializers.IntegerField(read_only=True)
+    language = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Diary
+        fields = (
+            "id", "user", "telegram_id", "language", "date",
+            "total_calories", "total_protein", "total_fat", "total_carbs"
+        )
+
+
+class MacroTotalsSerializer(serializers.Serializer):
+    total_calories = serializers.DecimalField(max_digits=9, decimal_places=2)
+    total_protein = serializers.DecimalField(max_digits=9, decimal_places=2)
+    total_fat = serializers.DecimalField(max_digits=9, decimal_places=2)
+    total_carbs = serializers.DecimalField(max_digits=9, decimal_places=2)
+
+
+class DiaryTotalsSerializer(MacroTotalsSerializer):
+    id = serializers.IntegerField()
+    date = serializers.DateField()
+
+
+class DayTotalsSerializer(MacroTotalsSerializer):
+    date = serializers.DateField()
+
+
+class DiaryRangeSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    logged_days = serializers.IntegerField()
+    days = DayTotalsSerializer(many=True)
+    totals = MacroTotalsSerializer()
+    averages = MacroTotalsSerializer()
@@ -1,18 +1,184 @@
-from decimal import Decimal
-from django.db.models import Sum
-from .models import Diary
-
-
-def recalc_diary_totals(diary: Diary):
-    print("Service triggered")
-    agg = diary.meals.aggregate(
-        calories=Sum('calories'),
-        protein=Sum('protein'),
-        fat=Sum('fat'),
-        carbs=Sum('carbs')
+from datetime import datetime, time, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import AppUser, DailyActivity, Diary, Meal
+
+
+MACRO_FIELDS = {
+    "calories": "total_calories",
+    "protein": "total_protein",
+    "fat": "total_fat",
+    "carbs": "total_carbs",
+}
+
+
+def quantize_macro(field, value):
+    exponent = Decimal(1).scaleb(-Meal._meta.get_field(field).decimal_places)
+    return Decimal(str(value)).quantize(exponent, rounding=ROUND_HALF_UP)
+
+
+def quantize_macros(meal):
+    # The column keeps only decimal_places digits, so the totals must add the
+    # same rounded value rather than the one held in memory.
+    for field in MACRO_FIELDS:
+        value = getattr(meal, field)
+        if value is not None:
+            setattr(meal, field, quantize_macro(field, value))
+
+
+def meal_snapshot(meal):
+    snapshot = {"diary_id": meal.diary_id}
+    for field in MACRO_FIELDS:
+        snapshot[field] = quantize_macro(field, getattr(meal, field) or 0)
+    return snapshot
+
+
+def apply_meal_change(previous=None, current=None):
+    deltas = {}
+
+    for snapshot, sign in ((previous, -1), (current, 1)):
+        if snapshot is None:
+            continue
+
+        delta = deltas.setdefault(snapshot["diary_id"], dict.fromkeys(MACRO_FIELDS, Decimal("0")))
+        for field in MACRO_FIELDS:
+            delta[field] += sign * snapshot[field]
+
+    for diary_id, delta in deltas.items():
+        Diary.objects.filter(pk=diary_id).update(
+            updated_at=timezone.now(),
+            **{
+                total_field: F(total_field) + delta[field]
+                for field, total_field in MACRO_FIELDS.items()
+            }
+        )
+
+
+class IdempotencyKeyConflict(Exception):
+    pass
+
+
+def log_meal(user, meal_data, idempotency_key=None, day=None):
+    day = day or timezone.localdate()
+
+    replays = Meal.objects.select_related("diary").filter(diary__user=user, idempotency_key=idempotency_key)
+
+    if idempotency_key:
+        meal = replays.first()
+        if meal is not None:
+            return meal, False
+
+    try:
+        with transaction.atomic():
+            diary, _ = Diary.objects.get_or_create(user=user, date=day)
+            meal = Meal.objects.create(diary=diary, idempotency_key=idempotency_key, **meal_data)
+    except IntegrityError:
+        if not idempotency_key:
+            raise
+
+        # Keys are unique across all meals; one owned by another user is not a replay.
+        meal = replays.first()
+        if meal is None:
+            raise IdempotencyKeyConflict(idempotency_key)
+        return meal, False
+
+    diary.refresh_from_db(fields=list(MACRO_FIELDS.values()))
+    return meal, True
+
+
+def record_meal_activity(user_id, moment=None):
+    moment = moment or timezone.now()
+    today = timezone.localdate(moment)
+    day_start = timezone.make_aware(datetime.combine(today, time.min))
+
+    first_today = AppUser.objects.filter(pk=user_id).filter(
+        Q(last_active_at__isnull=True) | Q(last_active_at__lt=day_start)
+    ).update(last_active_at=moment)
+
+    if not first_today:
+        AppUser.objects.filter(pk=user_id).update(last_active_at=moment)
+
+    DailyActivity.objects.get_or_create(date=today)
+    DailyActivity.objects.filter(date=today).update(
+        active_users=F("active_users") + first_today,
+        meals_logged=F("meals_logged") + 1
+    )
+
+
+def rebuild_activity_rollups():
+    last_activity = Meal.objects.values("diary__user").annotate(last=Max("created_at"))
+    for row in last_activity.iterator():
+        AppUser.objects.filter(pk=row["diary__user"]).update(last_active_at=row["last"])
+
+    DailyActivity.objects.all().delete()
+    rollups = Meal.objects.annotate(day=TruncDate("created_at")).values("day").annotate(
+        active_users=Count("diary__user", distinct=True),
+        meals_logged=Count("id")
+    ).order_by("day")
+
+    DailyActivity.objects.bulk_create(
+        DailyActivity(date=row["day"], active_users=row["active_users"], meals_logged=row["meals_logged"])
+        for row in rollups.iterator()
+    )
+
+
+def build_user_stats(days=7):
+    now = timezone.now()
+    week_ago = now - timedelta(days=7)
+    day_ago = now - timedelta(days=1)
+    since = timezone.localdate(now) - timedelta(days=days - 1)
+
+    by_language = AppUser.objects.values("language").annotate(
+        total=Count("id"),
+        active_7_days=Count("id", filter=Q(last_active_at__gte=week_ago)),
+        active_1_days=Count("id", filter=Q(last_active_at__gte=day_ago))
+    ).order_by("language")
+
+    totals = {"total_users": 0, "active_7_days": 0, "active_1_days": 0}
+    languages = {}
+    for row in by_language:
+        language = row.pop("language")
+        languages[language] = row
+        totals["total_users"] += row["total"]
+        totals["active_7_days"] += row["active_7_days"]
+        totals["active_1_days"] += row["active_1_days"]
+
+    daily = DailyActivity.objects.filter(date__gte=since).order_by("date").values(
+        "date", "active_users", "meals_logged"
     )
-    diary.total_calories = agg['calories'] or Decimal('0.00')
-    diary.total_protein = agg['protein'] or Decimal('0.00')
-    diary.total_fat = agg['fat'] or Decimal('0.00')
-    diary.total_carbs = agg['carbs'] or Decimal('0.00')
-    diary.save(update_fields=["total_calories", "total_protein", "total_fat", "total_carbs", "updated_at"])
+
+    return {
+        **totals,
+        "by_language": languages,
+        "daily": list(daily)
+    }
+
+
+def build_diary_range(telegram_id, start, end):
+    days = list(
+        Diary.objects.filter(user__telegram_id=telegram_id, date__range=(start, end))
+        .values("date")
+        .annotate(**{total_field: Sum(total_field) for total_field in MACRO_FIELDS.values()})
+        .order_by("date")
+    )
+
+    totals = {
+        total_field: sum((day[total_field] for day in days), Decimal("0"))
+        for total_field in MACRO_FIELDS.values()
+    }
+    averages = {
+        total_field: (total / len(days)) if days else Decimal("0")
+        for total_field, total in totals.items()
+    }
+
+    return {
+        "start": start,
+        "end": end,
+        "logged_days": len(days),
+        "days": days,
+        "totals": totals,
+        "averages": averages
+    }
@@ -1,16 +1,48 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
 from .models import Meal
-from .services import recalc_diary_totals
+from .services import apply_meal_change, meal_snapshot, quantize_macros, record_meal_activity
+
+
+@receiver(pre_save, sender=Meal)
+def meal_before_save(sender, instance: Meal, raw=False, **kwargs):
+    instance._previous_snapshot = None
+    quantize_macros(instance)
+    if raw or instance.pk is None:
+        return
+
+    previous = _locked_row(instance)
+    if previous is not None:
+        instance._previous_snapshot = meal_snapshot(previous)
+
+
+def _locked_row(instance):
+    # Read under a row lock so concurrent edits of one meal apply their deltas in turn.
+    return (
+        Meal.objects.select_for_update()
+        .filter(pk=instance.pk)
+        .only("diary_id", "calories", "protein", "fat", "carbs")
+        .first()
+    )
 
 
 @receiver(post_save, sender=Meal)
-def meal_saved(sender, instance: Meal, created, **kwargs):
-    print("saved")
-    recalc_diary_totals(instance.diary)
+def meal_saved(sender, instance: Meal, created, raw=False, **kwargs):
+    if raw:
+        return
+    apply_meal_change(getattr(instance, "_previous_snapshot", None), meal_snapshot(instance))
+
+    if created:
+        record_meal_activity(instance.diary.user_id)
+
+
+@receiver(pre_delete, sender=Meal)
+def meal_before_delete(sender, instance: Meal, **kwargs):
+    # The instance may be stale; subtract what the row holds now.
+    previous = _locked_row(instance)
+    instance._deleted_snapshot = meal_snapshot(previous) if previous is not None else None
 
 
 @receiver(post_delete, sender=Meal)
 def meal_deleted(sender, instance: Meal, **kwargs):
-    print("deleted")
-    recalc_diary_totals(instance.diary)
+    apply_meal_change(getattr(instance, "_deleted_snapshot", None), None)
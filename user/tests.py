@@ -1,3 +1,646 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
 
-# Create your tests here.
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from . import signals
+from .models import AppUser, DailyActivity, Diary, Meal
+from .serializers import MealSerializer
+
+
+class DiaryViewByDateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AppUser.objects.create(telegram_id=1001)
+        cls.diary = Diary.objects.create(user=cls.user, date=date(2025, 3, 14))
+        Diary.objects.create(user=cls.user, date=date(2025, 3, 13))
+
+    def add_meals(self, count):
+        for i in range(count):
+            Meal.objects.create(
+                diary=self.diary, food_name=f"meal {i}", grams=100,
+                calories=100, protein=10, fat=5, carbs=20
+            )
+
+    def get_diary(self, year=2025, month=3, day=14):
+        return self.client.get(f"/api/diary/date/{self.user.id}/{year}/{month}/{day}")
+
+    def test_returns_diary_with_meals(self):
+        self.add_meals(2)
+
+        response = self.get_diary()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(response.json()[0]["id"], self.diary.id)
+        self.assertEqual(response.json()[0]["total_calories"], "200.00")
+        self.assertEqual(len(response.json()[0]["meals"]), 2)
+
+    def test_query_count_does_not_grow_with_meals(self):
+        self.add_meals(1)
+        with self.assertNumQueries(2):
+            self.get_diary()
+
+        self.add_meals(25)
+        with self.assertNumQueries(2):
+            self.get_diary()
+
+    def test_get_does_not_write(self):
+        self.add_meals(1)
+        updated_at = Diary.objects.get(pk=self.diary.pk).updated_at
+
+        with self.assertNumQueries(2):
+            self.get_diary()
+
+        self.assertEqual(Diary.objects.get(pk=self.diary.pk).updated_at, updated_at)
+
+    def test_missing_day_is_empty(self):
+        with self.assertNumQueries(1):
+            response = self.get_diary(day=15)
+
+        self.assertEqual(response.json(), [])
+
+    def test_invalid_date_is_empty(self):
+        with self.assertNumQueries(0):
+            response = self.get_diary(month=2, day=30)
+
+        self.assertEqual(response.json(), [])
+
+
+
+class BotContextTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AppUser.objects.create(telegram_id=2002, language="en")
+        cls.diary = Diary.objects.create(user=cls.user, date=date(2025, 3, 14))
+        Diary.objects.create(user=cls.user, date=date(2025, 3, 13))
+        Meal.objects.create(
+            diary=cls.diary, food_name="soup", grams=250,
+            calories=150, protein=8, fat=4, carbs=20
+        )
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"BOT_TOKEN": "test-token"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_context(self, telegram_id=2002, year=2025, month=3, day=14):
+        return self.client.get(
+            f"/api/users/telegram/{telegram_id}/context/{year}/{month}/{day}",
+            headers={"Auth": "test-token"}
+        )
+
+    def test_returns_profile_and_diary_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.get_context()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user"]["id"], self.user.id)
+        self.assertEqual(response.json()["user"]["language"], "en")
+        self.assertEqual(response.json()["diary"], {
+            "id": self.diary.id,
+            "date": "2025-03-14",
+            "total_calories": "150.00",
+            "total_protein": "8.00",
+            "total_fat": "4.00",
+            "total_carbs": "20.00"
+        })
+
+    def test_day_without_diary(self):
+        with self.assertNumQueries(1):
+            response = self.get_context(day=15)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user"]["id"], self.user.id)
+        self.assertIsNone(response.json()["diary"])
+
+    def test_unknown_user(self):
+        self.assertEqual(self.get_context(telegram_id=1).status_code, 404)
+
+    def test_invalid_date(self):
+        with self.assertNumQueries(0):
+            response = self.get_context(month=2, day=30)
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_token(self):
+        response = self.client.get("/api/users/telegram/2002/context/2025/3/14")
+
+        self.assertEqual(response.status_code, 403)
+
+
+
+class LogMealTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AppUser.objects.create(telegram_id=3003)
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"BOT_TOKEN": "test-token"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def log_meal(self, telegram_id=3003, **overrides):
+        payload = {
+            "food_name": "plov", "grams": 250, "calories": "480.00",
+            "protein": "14.00", "fat": "21.00", "carbs": "58.00",
+            **overrides
+        }
+        return self.client.post(
+            f"/api/users/telegram/{telegram_id}/meals/today", payload,
+            content_type="application/json", headers={"Auth": "test-token"}
+        )
+
+    def test_creates_diary_and_returns_totals(self):
+        response = self.log_meal(idempotency_key="a" * 32)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["diary"]["total_calories"], "480.00")
+        self.assertEqual(response.json()["diary"]["date"], str(timezone.localdate()))
+        self.assertEqual(Diary.objects.filter(user=self.user).count(), 1)
+
+    def test_totals_accumulate_in_existing_diary(self):
+        self.log_meal()
+        response = self.log_meal(calories="20.50")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["diary"]["total_calories"], "500.50")
+        self.assertEqual(Diary.objects.filter(user=self.user).count(), 1)
+
+    def test_replay_with_same_key_does_not_duplicate(self):
+        first = self.log_meal(idempotency_key="b" * 32)
+        second = self.log_meal(idempotency_key="b" * 32)
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()["meal"]["id"], first.json()["meal"]["id"])
+        self.assertEqual(second.json()["diary"]["total_calories"], "480.00")
+        self.assertEqual(Meal.objects.filter(diary__user=self.user).count(), 1)
+
+    def test_key_used_by_another_user_conflicts(self):
+        AppUser.objects.create(telegram_id=3004)
+        self.log_meal(idempotency_key="c" * 32)
+
+        response = self.log_meal(telegram_id=3004, idempotency_key="c" * 32)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Meal.objects.filter(diary__user__telegram_id=3004).exists())
+
+    def test_unknown_user(self):
+        self.assertEqual(self.log_meal(telegram_id=1).status_code, 404)
+
+    def test_invalid_payload(self):
+        response = self.log_meal(grams=0)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Diary.objects.filter(user=self.user).exists())
+
+
+class MealTotalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AppUser.objects.create(telegram_id=3101)
+        cls.diary = Diary.objects.create(user=cls.user, date=date(2025, 3, 14))
+        cls.other = Diary.objects.create(user=cls.user, date=date(2025, 3, 15))
+
+    def add_meal(self, diary=None, **macros):
+        values = {"calories": 100, "protein": 10, "fat": 5, "carbs": 20, **macros}
+        return Meal.objects.create(diary=diary or self.diary, food_name="plov", grams=100, **values)
+
+    def totals(self, diary):
+        diary.refresh_from_db()
+        return diary.total_calories, diary.total_protein, diary.total_fat, diary.total_carbs
+
+    def test_update_applies_difference(self):
+        meal = self.add_meal()
+        self.add_meal(calories=50)
+
+        meal.calories = 250
+        meal.fat = 1
+        meal.save()
+
+        self.assertEqual(self.totals(self.diary), (300, 20, 6, 40))
+
+    def test_move_between_diaries(self):
+        meal = self.add_meal()
+        self.add_meal(calories=40, protein=4, fat=2, carbs=8)
+
+        meal.diary = self.other
+        meal.save()
+
+        self.assertEqual(self.totals(self.diary), (40, 4, 2, 8))
+        self.assertEqual(self.totals(self.other), (100, 10, 5, 20))
+
+    def test_delete_subtracts(self):
+        meal = self.add_meal()
+        self.add_meal(calories=30, protein=3, fat=1, carbs=6)
+
+        meal.delete()
+
+        self.assertEqual(self.totals(self.diary), (30, 3, 1, 6))
+
+    def test_delete_of_stale_instance_subtracts_stored_values(self):
+        stale = self.add_meal()
+        self.add_meal(calories=30, protein=3, fat=1, carbs=6)
+
+        fresh = Meal.objects.get(pk=stale.pk)
+        fresh.calories = 250
+        fresh.save()
+        stale.delete()
+
+        self.assertEqual(self.totals(self.diary), (30, 3, 1, 6))
+
+    def test_totals_add_stored_rounded_values(self):
+        for _ in range(3):
+            self.add_meal(calories=Decimal("1.005"), protein=Decimal("0.333"))
+
+        stored = Meal.objects.filter(diary=self.diary).aggregate(calories=Sum("calories"), protein=Sum("protein"))
+        calories, protein, _, _ = self.totals(self.diary)
+
+        self.assertEqual(calories, stored["calories"])
+        self.assertEqual(protein, stored["protein"])
+        self.assertEqual(calories, Decimal("3.03"))
+
+
+class ConcurrentMealTotalsTests(TransactionTestCase):
+    def test_concurrent_inserts_into_one_diary(self):
+        user = AppUser.objects.create(telegram_id=3102)
+        diary = Diary.objects.create(user=user, date=date(2025, 3, 14))
+        start = threading.Barrier(4)
+        errors = []
+
+        def add_meals():
+            try:
+                start.wait()
+                for _ in range(5):
+                    Meal.objects.create(
+                        diary_id=diary.pk, food_name="plov", grams=100,
+                        calories="10.25", protein=1, fat=1, carbs=1
+                    )
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=add_meals) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        diary.refresh_from_db()
+        self.assertEqual(errors, [])
+        self.assertEqual(diary.meals.count(), 20)
+        self.assertEqual(diary.total_calories, Decimal("205.00"))
+        self.assertEqual(diary.total_protein, 20)
+
+    def test_concurrent_updates_of_one_meal(self):
+        user = AppUser.objects.create(telegram_id=3103)
+        diary = Diary.objects.create(user=user, date=date(2025, 3, 14))
+        meal = Meal.objects.create(diary=diary, food_name="plov", grams=100, calories=100, protein=1, fat=1, carbs=1)
+        Meal.objects.create(diary=diary, food_name="tea", grams=200, calories=5, protein=0, fat=0, carbs=1)
+
+        # Both updates read the previous row before either writes, unless the read is locked.
+        read = threading.Barrier(2, timeout=0.5)
+        waiting = threading.local()
+        snapshot = signals.meal_snapshot
+
+        def slow_snapshot(instance):
+            if not getattr(waiting, "done", False):
+                waiting.done = True
+                try:
+                    read.wait()
+                except threading.BrokenBarrierError:
+                    pass
+            return snapshot(instance)
+
+        errors = []
+
+        def update(calories):
+            try:
+                serializer = MealSerializer(Meal.objects.get(pk=meal.pk), data={"calories": calories}, partial=True)
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        with mock.patch.object(signals, "meal_snapshot", slow_snapshot):
+            threads = [threading.Thread(target=update, args=(calories,)) for calories in ("200.00", "300.00")]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        diary.refresh_from_db()
+        self.assertEqual(errors, [])
+        self.assertEqual(diary.total_calories, diary.meals.aggregate(total=Sum("calories"))["total"])
+        self.assertIn(diary.total_calories, (Decimal("205.00"), Decimal("305.00")))
+
+
+class ActivityRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = AppUser.objects.create(telegram_id=3201, language="ru")
+        cls.bob = AppUser.objects.create(telegram_id=3202, language="uz")
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"BOT_TOKEN": "test-token"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+
+    def add_meal(self, user, day=None):
+        diary, _ = Diary.objects.get_or_create(user=user, date=day or timezone.localdate())
+        return Meal.objects.create(diary=diary, food_name="plov", grams=100, calories=100, protein=1, fat=1, carbs=1)
+
+    def today_activity(self):
+        return DailyActivity.objects.values_list("active_users", "meals_logged").get(date=timezone.localdate())
+
+    def get_stats(self, query=""):
+        return self.client.get(f"/api/stats/{query}", headers={"Auth": "test-token"})
+
+    def test_first_meal_of_day_counts_user_once(self):
+        self.add_meal(self.alice)
+        self.assertEqual(self.today_activity(), (1, 1))
+
+        self.add_meal(self.alice)
+        self.assertEqual(self.today_activity(), (1, 2))
+
+        self.add_meal(self.bob)
+        self.assertEqual(self.today_activity(), (2, 3))
+
+    def test_user_active_yesterday_counts_again_today(self):
+        AppUser.objects.filter(pk=self.alice.pk).update(last_active_at=timezone.now() - timedelta(days=1))
+
+        self.add_meal(self.alice)
+
+        self.assertEqual(self.today_activity(), (1, 1))
+        self.alice.refresh_from_db()
+        self.assertEqual(timezone.localtime(self.alice.last_active_at).date(), timezone.localdate())
+
+    def test_rebuild_activity_recomputes_from_meals(self):
+        two_days_ago = timezone.now() - timedelta(days=2)
+        for meal in (self.add_meal(self.alice), self.add_meal(self.alice), self.add_meal(self.bob)):
+            Meal.objects.filter(pk=meal.pk).update(created_at=two_days_ago)
+        self.add_meal(self.bob)
+        DailyActivity.objects.update(active_users=99, meals_logged=99)
+
+        call_command("rebuild_activity", stdout=StringIO())
+
+        rollups = dict(
+            (row[0], row[1:]) for row in DailyActivity.objects.values_list("date", "active_users", "meals_logged")
+        )
+        self.assertEqual(rollups, {
+            timezone.localdate(two_days_ago): (2, 3),
+            timezone.localdate(): (1, 1)
+        })
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.last_active_at, two_days_ago)
+
+    def test_stats_days_window_and_cache(self):
+        today = timezone.localdate()
+        for offset in (0, 3, 10):
+            DailyActivity.objects.create(date=today - timedelta(days=offset), active_users=offset + 1, meals_logged=1)
+        AppUser.objects.filter(pk=self.alice.pk).update(last_active_at=timezone.now())
+
+        data = self.get_stats().json()
+        self.assertEqual(data["total_users"], 2)
+        self.assertEqual(data["active_1_days"], 1)
+        self.assertEqual(data["by_language"]["uz"]["total"], 1)
+        self.assertEqual([row["active_users"] for row in data["daily"]], [4, 1])
+
+        self.assertEqual(len(self.get_stats("?days=1").json()["daily"]), 1)
+        self.assertEqual(len(self.get_stats("?days=30").json()["daily"]), 3)
+        self.assertEqual(len(self.get_stats("?days=abc").json()["daily"]), 2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_stats().json(), data)
+
+
+class DiarySummaryListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            AppUser.objects.create(telegram_id=3300 + i, language=("ru", "uz", "en")[i % 3]) for i in range(5)
+        ]
+        cls.muted = AppUser.objects.create(telegram_id=3399, morning_summary_enabled=False)
+
+        for user in cls.users:
+            Diary.objects.create(user=user, date=date(2025, 3, 14), total_calories=user.telegram_id)
+            Diary.objects.create(user=user, date=date(2025, 3, 13))
+        Diary.objects.create(user=cls.muted, date=date(2025, 3, 14))
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"BOT_TOKEN": "test-token"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, url="/api/diary/summaries/2025/3/14"):
+        return self.client.get(url, headers={"Auth": "test-token"})
+
+    def test_filters_by_date_and_reminder(self):
+        with self.assertNumQueries(1):
+            data = self.get().json()
+
+        results = data["results"]
+        self.assertEqual([row["telegram_id"] for row in results], [user.telegram_id for user in self.users])
+        self.assertEqual({row["date"] for row in results}, {"2025-03-14"})
+        self.assertIsNone(data["next"])
+
+    def test_includes_joined_user_fields(self):
+        row = self.get().json()["results"][1]
+
+        self.assertEqual(row["user"], self.users[1].id)
+        self.assertEqual(row["telegram_id"], 3301)
+        self.assertEqual(row["language"], "uz")
+        self.assertEqual(row["total_calories"], "3301.00")
+
+    def test_cursor_pagination_walks_all_pages(self):
+        url, seen = "/api/diary/summaries/2025/3/14?page_size=2", []
+        while url:
+            data = self.get(url).json()
+            self.assertLessEqual(len(data["results"]), 2)
+            seen.extend(row["telegram_id"] for row in data["results"])
+            url = data["next"]
+
+        self.assertEqual(seen, [user.telegram_id for user in self.users])
+
+    def test_empty_and_invalid_dates(self):
+        self.assertEqual(self.get("/api/diary/summaries/2025/3/15").json()["results"], [])
+        self.assertEqual(self.get("/api/diary/summaries/2025/2/30").json()["results"], [])
+
+    def test_requires_token(self):
+        self.assertEqual(self.client.get("/api/diary/summaries/2025/3/14").status_code, 403)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AppUser.objects.create(telegram_id=4004)
+        cls.diary = Diary.objects.create(user=cls.user, date=date(2025, 3, 14))
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"BOT_TOKEN": "test-token"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, url, etag=None):
+        headers = {"Auth": "test-token"}
+        if etag:
+            headers["If-None-Match"] = etag
+        return self.client.get(url, headers=headers)
+
+    def add_meal(self):
+        Meal.objects.create(
+            diary=self.diary, food_name="apple", grams=100,
+            calories=52, protein=0, fat=0, carbs=14
+        )
+
+    def test_diary_by_date_not_modified(self):
+        url = f"/api/diary/date/{self.user.id}/2025/3/14"
+        first = self.get(url)
+        self.assertIn("Last-Modified", first)
+
+        with self.assertNumQueries(1):
+            response = self.get(url, first["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+        self.add_meal()
+        response = self.get(url, first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+
+    def test_profile_not_modified(self):
+        url = "/api/users/telegram/4004"
+        first = self.get(url)
+
+        self.assertEqual(self.get(url, first["ETag"]).status_code, 304)
+
+        self.client.patch(
+            url, {"goal": "lose"}, content_type="application/json", headers={"Auth": "test-token"}
+        )
+        self.assertEqual(self.get(url, first["ETag"]).status_code, 200)
+
+    def test_context_not_modified(self):
+        url = "/api/users/telegram/4004/context/2025/3/14"
+        first = self.get(url)
+
+        with self.assertNumQueries(1):
+            response = self.get(url, first["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+        self.add_meal()
+        self.assertEqual(self.get(url, first["ETag"]).status_code, 200)
+
+
+
+class DiaryRangeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AppUser.objects.create(telegram_id=5005)
+        other = AppUser.objects.create(telegram_id=5006)
+        for day, calories in ((10, 1000), (12, 2000), (20, 500)):
+            Diary.objects.create(user=cls.user, date=date(2025, 3, day), total_calories=calories, total_protein=50)
+        Diary.objects.create(user=other, date=date(2025, 3, 11), total_calories=9999)
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"BOT_TOKEN": "test-token"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_range(self, start="2025-03-10", end="2025-03-16", telegram_id=5005):
+        return self.client.get(
+            f"/api/users/telegram/{telegram_id}/diary/range/{start}/{end}", headers={"Auth": "test-token"}
+        )
+
+    def test_per_day_totals_and_averages_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.get_range()
+
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["logged_days"], 2)
+        self.assertEqual([day["date"] for day in data["days"]], ["2025-03-10", "2025-03-12"])
+        self.assertEqual(data["totals"]["total_calories"], "3000.00")
+        self.assertEqual(data["averages"]["total_calories"], "1500.00")
+        self.assertEqual(data["averages"]["total_protein"], "50.00")
+
+    def test_empty_range(self):
+        data = self.get_range("2025-04-01", "2025-04-07").json()
+
+        self.assertEqual(data["logged_days"], 0)
+        self.assertEqual(data["days"], [])
+        self.assertEqual(data["averages"]["total_calories"], "0.00")
+
+    def test_unknown_user(self):
+        self.assertEqual(self.get_range(telegram_id=1).status_code, 404)
+
+    def test_invalid_range(self):
+        self.assertEqual(self.get_range("2025-03-16", "2025-03-10").status_code, 400)
+        self.assertEqual(self.get_range("2024-01-01", "2025-03-10").status_code, 400)
+        self.assertEqual(self.get_range("2025-02-30", "2025-03-10").status_code, 400)
+
+
+class SeedAndBenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("seed_data", users=30, days=5, chunk=7, start_telegram_id=7000, stdout=StringIO())
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"BOT_TOKEN": "test-token"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_seeded_totals_match_meals(self):
+        self.assertEqual(AppUser.objects.count(), 30)
+        self.assertTrue(Meal.objects.exists())
+
+        for diary in Diary.objects.annotate(calories=Sum("meals__calories"), fat=Sum("meals__fat")):
+            self.assertEqual(diary.total_calories, diary.calories)
+            self.assertEqual(diary.total_fat, diary.fat)
+            self.assertLessEqual(diary.created_at, diary.updated_at)
+            self.assertEqual(timezone.localtime(diary.updated_at).date(), diary.date)
+
+        self.assertEqual(
+            DailyActivity.objects.aggregate(total=Sum("meals_logged"))["total"], Meal.objects.count()
+        )
+
+    def test_taken_telegram_ids_are_refused(self):
+        with self.assertRaisesMessage(CommandError, "already taken"):
+            call_command("seed_data", users=5, start_telegram_id=7010, stdout=StringIO())
+
+    def test_benchmark_baseline_round_trip(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            baseline = os.path.join(workdir, "baseline.json")
+            options = {"repeat": 2, "warmup": 0, "samples": 3, "stdout": StringIO()}
+
+            call_command("bench_api", save_baseline=baseline, **options)
+            with open(baseline) as f:
+                run = json.load(f)
+
+            self.assertEqual(run["meta"]["rows"]["users"], 30)
+            self.assertEqual(Meal.objects.filter(food_name="bench").count(), 0)
+            for name, result in run["endpoints"].items():
+                self.assertIn("p50_ms", result, name)
+            self.assertEqual(run["endpoints"]["profile"]["queries"], 1)
+
+            for result in run["endpoints"].values():
+                result["queries"] = 0
+            with open(baseline, "w") as f:
+                json.dump(run, f)
+
+            with self.assertRaisesMessage(CommandError, "Regressions against baseline"):
+                call_command("bench_api", baseline=baseline, fail_on_regression=True, only=["profile"], **options)
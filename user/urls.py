@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import AppUserViewSet, DiaryViewSet, MealViewSet, AppUserDetailByTelegramID, DiaryViewByDate, UserStatsAPIView, UserListByMorningReminderAPIView
+from .views import AppUserViewSet, DiaryViewSet, MealViewSet, AppUserDetailByTelegramID, DiaryViewByDate, UserStatsAPIView, UserListByMorningReminderAPIView, DiarySummaryListByDateAPIView, BotContextAPIView, LogMealAPIView, DiaryRangeAPIView
 
 
 router = DefaultRouter()
@@ -13,7 +13,11 @@ router.register(r'meal', MealViewSet, basename='meal')
 urlpatterns = [
     path('', include(router.urls)),
     path('users/telegram/<int:telegram_id>', AppUserDetailByTelegramID.as_view()),
+    path('users/telegram/<int:telegram_id>/context/<str:year>/<str:month>/<str:day>', BotContextAPIView.as_view()),
+    path('users/telegram/<int:telegram_id>/meals/today', LogMealAPIView.as_view()),
+    path('users/telegram/<int:telegram_id>/diary/range/<str:start>/<str:end>', DiaryRangeAPIView.as_view()),
     path('diary/date/<int:user_id>/<str:year>/<str:month>/<str:day>', DiaryViewByDate.as_view()),
     path("stats/", UserStatsAPIView.as_view()),
-    path("users/reminder", UserListByMorningReminderAPIView.as_view())
+    path("users/reminder", UserListByMorningReminderAPIView.as_view()),
+    path('diary/summaries/<str:year>/<str:month>/<str:day>', DiarySummaryListByDateAPIView.as_view())
 ]
@@ -1,18 +1,26 @@
 import os
 
-from rest_framework import generics, viewsets
+from rest_framework import generics, status, viewsets
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import BasePermission
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
-from django.utils.timezone import now
-from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, FilteredRelation, Q, prefetch_related_objects
+from django.http import Http404
+from datetime import date, timedelta
 
 from dotenv import load_dotenv
 
+from .conditional import latest_timestamp, make_etag, not_modified, set_validators
 from .models import AppUser, Diary, Meal
-from .serializers import AppUserSerializer, DiarySerializer, MealSerializer
-from .services import recalc_diary_totals
+from .serializers import (
+    AppUserSerializer, DiaryRangeSerializer, DiarySerializer, DiarySummarySerializer, DiaryTotalsSerializer,
+    LogMealSerializer, MealSerializer
+)
+from .services import IdempotencyKeyConflict, build_diary_range, build_user_stats, log_meal
 
 
 load_dotenv()
@@ -37,6 +45,110 @@ class AppUserDetailByTelegramID(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [CustomPermission]
     lookup_field = 'telegram_id'
 
+    def retrieve(self, request, *args, **kwargs):
+        user = self.get_object()
+
+        etag = make_etag(user.pk, user.updated_at, user.last_active_at)
+        last_modified = latest_timestamp(user.updated_at, user.last_active_at)
+
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        return set_validators(Response(self.get_serializer(user).data), etag, last_modified)
+
+
+class BotContextAPIView(APIView):
+    permission_classes = [CustomPermission]
+
+    def get(self, request, telegram_id, year, month, day):
+        try:
+            day = date(int(year), int(month), int(day))
+        except ValueError:
+            return Response({"detail": "Invalid date"}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = AppUser.objects.annotate(
+            day_diary=FilteredRelation("diaries", condition=Q(diaries__date=day)),
+            diary_id=F("day_diary__id"),
+            diary_total_calories=F("day_diary__total_calories"),
+            diary_total_protein=F("day_diary__total_protein"),
+            diary_total_fat=F("day_diary__total_fat"),
+            diary_total_carbs=F("day_diary__total_carbs"),
+            diary_updated_at=F("day_diary__updated_at")
+        ).filter(telegram_id=telegram_id).first()
+
+        if user is None:
+            raise Http404
+
+        etag = make_etag(user.pk, user.updated_at, user.last_active_at, user.diary_id, user.diary_updated_at)
+        last_modified = latest_timestamp(user.updated_at, user.last_active_at, user.diary_updated_at)
+
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        diary = None
+        if user.diary_id is not None:
+            diary = DiaryTotalsSerializer({
+                "id": user.diary_id,
+                "date": day,
+                "total_calories": user.diary_total_calories,
+                "total_protein": user.diary_total_protein,
+                "total_fat": user.diary_total_fat,
+                "total_carbs": user.diary_total_carbs
+            }).data
+
+        return set_validators(
+            Response({"user": AppUserSerializer(user).data, "diary": diary}), etag, last_modified
+        )
+
+
+class LogMealAPIView(APIView):
+    permission_classes = [CustomPermission]
+
+    def post(self, request, telegram_id):
+        user = AppUser.objects.filter(telegram_id=telegram_id).first()
+        if user is None:
+            raise Http404
+
+        serializer = LogMealSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        meal_data = dict(serializer.validated_data)
+        idempotency_key = meal_data.pop("idempotency_key", None) or None
+
+        try:
+            meal, created = log_meal(user, meal_data, idempotency_key)
+        except IdempotencyKeyConflict:
+            return Response({"detail": "Idempotency key already used"}, status=status.HTTP_409_CONFLICT)
+
+        return Response(
+            {"meal": MealSerializer(meal).data, "diary": DiaryTotalsSerializer(meal.diary).data},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+
+class DiaryRangeAPIView(APIView):
+    permission_classes = [CustomPermission]
+
+    def get(self, request, telegram_id, start, end):
+        try:
+            start = date.fromisoformat(start)
+            end = date.fromisoformat(end)
+        except ValueError:
+            return Response({"detail": "Invalid date"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if end < start or end - start >= timedelta(days=settings.DIARY_RANGE_MAX_DAYS):
+            return Response({"detail": "Invalid range"}, status=status.HTTP_400_BAD_REQUEST)
+
+        report = build_diary_range(telegram_id, start, end)
+
+        # Logged days prove the user exists; only an empty range needs the lookup.
+        if not report["logged_days"] and not AppUser.objects.filter(telegram_id=telegram_id).exists():
+            raise Http404
+
+        return Response(DiaryRangeSerializer(report).data)
+
 
 class DiaryViewSet(viewsets.ModelViewSet):
     queryset = Diary.objects.all()
@@ -49,19 +161,25 @@ class DiaryViewByDate(generics.ListAPIView):
     serializer_class = DiarySerializer
 
     def get_queryset(self):
-        user_id = self.kwargs['user_id']
-        year = int(self.kwargs['year'])
-        month = int(self.kwargs['month'])
-        day = int(self.kwargs['day'])
-        
-        diaries = Diary.objects.filter(
-            user=user_id, date__year=year, date__month=month, date__day=day
-        )
+        try:
+            day = date(int(self.kwargs['year']), int(self.kwargs['month']), int(self.kwargs['day']))
+        except ValueError:
+            return Diary.objects.none()
+
+        return Diary.objects.filter(user_id=self.kwargs['user_id'], date=day)
+
+    def list(self, request, *args, **kwargs):
+        diaries = list(self.get_queryset())
+
+        etag = make_etag(*((diary.pk, diary.updated_at) for diary in diaries))
+        last_modified = latest_timestamp(*(diary.updated_at for diary in diaries))
 
-        for diary in diaries:
-            recalc_diary_totals(diary)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
 
-        return diaries
+        prefetch_related_objects(diaries, "meals")
+        return set_validators(Response(self.get_serializer(diaries, many=True).data), etag, last_modified)
 
 
 class MealViewSet(viewsets.ModelViewSet):
@@ -74,18 +192,49 @@ class UserStatsAPIView(APIView):
     permission_classes = [CustomPermission]
 
     def get(self, request):
-        total_users = AppUser.objects.count()
-        active_7_days = Meal.objects.filter(created_at__gte=now() - timedelta(days=7)).values("diary__user").distinct().count()
-        active_1_days = Meal.objects.filter(created_at__gte=now() - timedelta(days=1)).values("diary__user").distinct().count()  
-
-        return Response({
-            "total_users": total_users,
-            "active_7_days": active_7_days,
-            "active_1_days": active_1_days
-        })
+        try:
+            days = int(request.query_params.get("days", 7))
+        except ValueError:
+            days = 7
+        days = max(1, min(days, settings.STATS_MAX_DAYS))
+
+        stats = cache.get_or_set(
+            f"user_stats:{days}",
+            lambda: build_user_stats(days),
+            settings.STATS_CACHE_TIMEOUT
+        )
+        return Response(stats)
     
 
 class UserListByMorningReminderAPIView(generics.ListAPIView):
     queryset = AppUser.objects.filter(morning_summary_enabled=True)
     serializer_class = AppUserSerializer
     permission_classes = [CustomPermission]
+
+
+class DiarySummaryPagination(CursorPagination):
+    page_size = 500
+    page_size_query_param = "page_size"
+    max_page_size = 5000
+    ordering = "id"
+
+
+class DiarySummaryListByDateAPIView(generics.ListAPIView):
+    serializer_class = DiarySummarySerializer
+    permission_classes = [CustomPermission]
+    pagination_class = DiarySummaryPagination
+
+    def get_queryset(self):
+        try:
+            day = date(int(self.kwargs['year']), int(self.kwargs['month']), int(self.kwargs['day']))
+        except ValueError:
+            return Diary.objects.none()
+
+        return Diary.objects.filter(
+            date=day, user__morning_summary_enabled=True
+        ).annotate(
+            telegram_id=F("user__telegram_id"),
+            language=F("user__language")
+        ).only(
+            "id", "user_id", "date", "total_calories", "total_protein", "total_fat", "total_carbs"
+        )